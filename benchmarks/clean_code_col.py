@@ -0,0 +1,80 @@
+'''
+Compares the row by row clean_codes/create_flag_column with the chunked, vectorized clean_code_col.main
+on a synthetic code column, and checks both produce the same output.
+
+python benchmarks/clean_code_col.py -n 10000000
+python benchmarks/clean_code_col.py -n 10000000 -rb 1000000  # only time the row by row path on the first 1M rows
+python benchmarks/clean_code_col.py -n 10000000 -w 1 2 4 8  # compare worker counts
+'''
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dbt_pipeline_utils.scripts import clean_code_col
+
+CURIES = "HP,MONDO,LOINC,ICD10CM"
+
+# Pieces that show up in real annotation dumps: missing separators and colons, quotes, stray bars.
+TOKENS = ["HP:0004323", "HP0000234", "MONDO:0005148", "MONDO::0008903", "LOINC:8302-2",
+          "ICD10CM:E11.9", "|", "||", "|||", " ", "''", '"', "Ê", "hp:0001", "unmapped"]
+
+
+def write_synthetic(path, rows, seed=0):
+    rng = random.Random(seed)
+    pool = ["".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 6))) for _ in range(10_000)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("codes\n")
+        for _ in range(rows):
+            f.write('"' + rng.choice(pool).replace('"', '""') + '"\n')
+
+
+def row_by_row(path, nrows):
+    df = pd.read_csv(path, dtype=str, nrows=nrows).fillna("")
+    curies = CURIES.split(",")
+    df['cleaned_col'] = df['codes'].apply(lambda x: clean_code_col.clean_codes(x, curies))
+    df['correct_format'] = df['cleaned_col'].apply(clean_code_col.create_flag_column)
+    return df[['cleaned_col', 'correct_format']]
+
+
+def main(rows, row_by_row_rows, chunksize, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp) / "codes.csv"
+        out_path = Path(tmp) / "col_clean.csv"
+
+        write_synthetic(data_path, rows)
+        print(f"Synthetic column: {rows:,} rows, {data_path.stat().st_size / 1e6:.0f} MB")
+
+        for w in workers:
+            start = time.perf_counter()
+            clean_code_col.main(data_path, "codes", CURIES, output=out_path, chunksize=chunksize, workers=w)
+            vectorized = time.perf_counter() - start
+            print(f"chunked vectorized, {w} worker(s): {vectorized:.1f} s ({rows / vectorized:,.0f} rows/s)")
+
+        n = min(rows, row_by_row_rows)
+        start = time.perf_counter()
+        expected = row_by_row(data_path, n)
+        elapsed = time.perf_counter() - start
+        print(f"row by row:         {elapsed:.1f} s for {n:,} rows ({n / elapsed:,.0f} rows/s)")
+
+        result = pd.read_csv(out_path, dtype=str, nrows=n, keep_default_na=False)
+        same = ((result['cleaned_col'] == expected['cleaned_col']).all()
+                and (result['correct_format'] == expected['correct_format'].astype(str)).all())
+        print(f"identical output on the first {n:,} rows: {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark clean_code_col on a synthetic code column.")
+
+    parser.add_argument("-n", "--rows", required=False, default=10_000_000, type=int, help="Rows in the synthetic column")
+    parser.add_argument("-rb", "--row_by_row_rows", required=False, default=1_000_000, type=int, help="Rows timed with the row by row functions")
+    parser.add_argument("-cs", "--chunksize", required=False, default=clean_code_col.DEFAULT_CHUNKSIZE, type=int, help="Rows per chunk")
+    parser.add_argument("-w", "--workers", required=False, default=[1], type=int, nargs="+", help="Worker counts to time")
+
+    args = parser.parse_args()
+
+    main(rows=args.rows, row_by_row_rows=args.row_by_row_rows, chunksize=args.chunksize, workers=args.workers)
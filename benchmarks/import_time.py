@@ -0,0 +1,74 @@
+'''
+Measures the import cost of each dbt_pipeline_utils entry point using `python -X importtime`.
+
+python benchmarks/import_time.py
+python benchmarks/import_time.py -t 10
+'''
+
+import argparse
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "dbt_pipeline_utils.scripts.generate_docs",
+    "dbt_pipeline_utils.scripts.process_study",
+    "dbt_pipeline_utils.scripts.clean_code_col",
+    "dbt_pipeline_utils.scripts.code_api_search",
+    "dbt_pipeline_utils.scripts.transformation_helpers.generate_case_statements",
+]
+
+# Modules that should never be loaded just by importing an entry point.
+HEAVY_MODULES = ["pandas", "yaml", "jinja2", "search_dragon", "synapseclient", "duckdb"]
+
+
+def parse_importtime(stderr):
+    """
+    Returns {module: cumulative_us} from `-X importtime` output.
+    Lines look like: 'import time:       123 |       4567 | module.name'
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return parse_importtime(result.stderr), None
+
+
+def main(top):
+    for module in ENTRY_POINTS:
+        timings, error = measure(module)
+        if error:
+            print(f"{module}: import failed - {error}\n")
+            continue
+
+        total = timings.get(module, 0)
+        heavy = [m for m in HEAVY_MODULES if m in timings]
+        slowest = sorted(timings.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+        print(f"{module}: {total / 1000:.1f} ms")
+        print(f"  heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+        for name, cumulative in slowest:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report `python -X importtime` results for each entry point.")
+
+    parser.add_argument("-t", "--top", required=False, default=5, type=int, help="How many of the slowest imports to list per entry point")
+
+    args = parser.parse_args()
+
+    main(top=args.top)
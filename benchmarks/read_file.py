@@ -0,0 +1,119 @@
+'''
+Times read_file on synthetic data dictionaries and study yamls, per format and parser:
+csv with type inference vs dtype=str, the c and pyarrow csv engines, tsv, parquet and
+feather, and the pure python yaml SafeLoader vs libyaml's CSafeLoader.
+
+python benchmarks/read_file.py
+python benchmarks/read_file.py -n 200000 -r 5
+'''
+
+import argparse
+import importlib.util
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+from dbt_pipeline_utils.scripts.helpers.general import read_file
+
+DATA_TYPES = ["string", "integer", "float", "boolean", "date"]
+
+
+def synthetic_dictionary(rows, seed=0):
+    """A pipeline_format-like dictionary: mostly text, with numeric min/max columns that pandas infers."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "variable_name": [f"var_{i}" for i in range(rows)],
+        "variable_description": [f"Description of variable {i}, " + "x" * rng.randint(10, 80) for i in range(rows)],
+        "data_type": [rng.choice(DATA_TYPES) for _ in range(rows)],
+        "min": [rng.choice(["", str(rng.randint(0, 10))]) for _ in range(rows)],
+        "max": [rng.choice(["", str(rng.randint(10, 1000))]) for _ in range(rows)],
+        "units": [rng.choice(["", "years", "kg", "cm"]) for _ in range(rows)],
+        "enumerations": [";".join(f"code_{j}" for j in range(rng.randint(0, 6))) for _ in range(rows)],
+        "comment": ["" for _ in range(rows)],
+    })
+
+
+def synthetic_study_yaml(tables):
+    return {
+        "study_id": "bench",
+        "project_id": "bench",
+        "pipeline_db": "pg",
+        "data_dictionary": {
+            f"table_{i}": {"identifier": f"table_{i}_dd.csv", "stg_src_table_id": f"table_{i}_stg_dd.csv",
+                           "format": "pipeline_format", "import_type": "pg"}
+            for i in range(tables)
+        },
+        "data_files": {
+            f"table_{i}": {"identifier": f"table_{i}.csv", "join_cols": {f"table_{(i + 1) % tables}": "subject_id"}}
+            for i in range(tables)
+        },
+    }
+
+
+def best_of(repeats, fn):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(rows, tables, repeats):
+    has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+    has_libyaml = getattr(yaml, "__with_libyaml__", False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        df = synthetic_dictionary(rows)
+        df.to_csv(tmp / "dd.csv", index=False)
+        df.to_csv(tmp / "dd.tsv", index=False, sep="\t")
+        with open(tmp / "study.yaml", "w", encoding="utf-8") as f:
+            yaml.dump(synthetic_study_yaml(tables), f, sort_keys=False)
+        if has_pyarrow:
+            df.to_parquet(tmp / "dd.parquet")
+            df.to_feather(tmp / "dd.feather")
+
+        cases = [
+            ("csv, c engine, inferred types", "dd.csv", {"engine": "c"}),
+            ("csv, c engine, dtype=str", "dd.csv", {"engine": "c", "dtype": str}),
+            ("tsv, c engine, dtype=str", "dd.tsv", {"engine": "c", "dtype": str}),
+        ]
+        if has_pyarrow:
+            cases += [
+                ("csv, pyarrow engine, inferred types", "dd.csv", {"engine": "pyarrow"}),
+                ("csv, pyarrow engine, dtype=str", "dd.csv", {"engine": "pyarrow", "dtype": str}),
+                ("parquet", "dd.parquet", {}),
+                ("feather", "dd.feather", {}),
+            ]
+        cases.append(("yaml, python SafeLoader", "study.yaml", {"engine": "python"}))
+        if has_libyaml:
+            cases.append(("yaml, libyaml CSafeLoader", "study.yaml", {"engine": "libyaml"}))
+
+        print(f"Dictionary: {rows:,} rows, {(tmp / 'dd.csv').stat().st_size / 1e6:.1f} MB csv. "
+              f"Study yaml: {tables} tables, {(tmp / 'study.yaml').stat().st_size / 1e3:.0f} kB")
+        if not has_pyarrow:
+            print("pyarrow is not installed, skipping the pyarrow engine, parquet and feather")
+        if not has_libyaml:
+            print("PyYAML was built without libyaml, skipping CSafeLoader")
+
+        baselines = {}
+        for label, name, kwargs in cases:
+            seconds = best_of(repeats, lambda: read_file(tmp / name, **kwargs))
+            kind = "yaml" if name.endswith(".yaml") else "table"
+            baseline = baselines.setdefault(kind, seconds)
+            print(f"{label:<38} {seconds * 1000:>9.1f} ms  {baseline / seconds:>5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark read_file parsers and formats.")
+    parser.add_argument("-n", "--rows", type=int, default=100_000, help="Rows in the synthetic data dictionary")
+    parser.add_argument("-t", "--tables", type=int, default=500, help="Tables in the synthetic study yaml")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="Runs per case, the fastest is reported")
+    args = parser.parse_args()
+
+    main(args.rows, args.tables, args.repeats)
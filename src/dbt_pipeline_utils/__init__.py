@@ -1,4 +1,3 @@
-from search_dragon import logger as getlogger
 import logging
 from os import getenv
 
@@ -6,6 +5,15 @@ from os import getenv
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
 # Create a logger
+# Configured with the stdlib directly. Importing search_dragon just for its logger
+# pulled the search stack into every entry point.
 llevel = getenv("LOCUTUS_LOGLEVEL", logging.WARN)
-logger = getlogger(logformat=LOGGING_FORMAT, loglevel=llevel)
+# Only the package logger is configured, the root logger of applications importing the
+# package is left alone.
+logger = logging.getLogger(__name__)
+logger.setLevel(llevel)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOGGING_FORMAT))
+    logger.addHandler(handler)
 logger.info(f"Logger instanced with level: {llevel}")
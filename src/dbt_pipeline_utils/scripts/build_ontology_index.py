@@ -0,0 +1,65 @@
+"""
+Builds a local ontology index from downloaded ontology dumps, for code_api_search --local_index.
+
+python src/dbt_pipeline_utils/scripts/build_ontology_index.py -li 'ontologies.sqlite' --obo hp.obo mondo.obo
+
+CSV exports need the code and label columns, and the prefix when the codes don't carry one.
+
+python src/dbt_pipeline_utils/scripts/build_ontology_index.py -li 'ontologies.sqlite' --csv icd10cm.csv -p ICD10CM -cc code -lc description
+
+Adding to an existing index replaces terms with the same code.
+"""
+
+import argparse
+import time
+from dbt_pipeline_utils.scripts.helpers.ontology_index import OntologyIndex, parse_obo, parse_csv
+from dbt_pipeline_utils import logger
+
+
+def main(local_index, obo=None, csv_files=None, prefix=None, code_column=None, label_column=None,
+         description_column=None, delimiter=","):
+    start = time.perf_counter()
+    index = OntologyIndex(local_index)
+    try:
+        for filepath in obo or []:
+            count = index.add_terms(parse_obo(filepath))
+            logger.info(f"Added {count} terms from {filepath}")
+
+        for filepath in csv_files or []:
+            terms = parse_csv(filepath, code_column, label_column, prefix, description_column, delimiter)
+            count = index.add_terms(terms, obo_iri=False)
+            logger.info(f"Added {count} terms from {filepath}")
+
+        index.rebuild_label_index()
+    finally:
+        index.close()
+    logger.info(f"Built {local_index} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local ontology index from OBO and csv dumps.")
+
+    parser.add_argument("-li", "--local_index", required=True, help="Index file to create or add to. Format: 'path/to/ontologies.sqlite'")
+    parser.add_argument("--obo", required=False, nargs="+", help="OBO files, e.g. hp.obo mondo.obo")
+    parser.add_argument("--csv", required=False, nargs="+", help="csv exports, e.g. ICD10CM or LOINC")
+    parser.add_argument("-p", "--prefix", required=False, help="Prefix added to --csv codes that don't have one, e.g. ICD10CM")
+    parser.add_argument("-cc", "--code_column", required=False, help="Column in --csv containing the codes")
+    parser.add_argument("-lc", "--label_column", required=False, help="Column in --csv containing the labels")
+    parser.add_argument("-dc", "--description_column", required=False, help="Optional column in --csv containing descriptions")
+    parser.add_argument("-d", "--delimiter", required=False, default=",", help="--csv delimiter")
+
+    args = parser.parse_args()
+
+    if not args.obo and not args.csv:
+        parser.error("one of --obo or --csv is required")
+    if args.csv and not (args.code_column and args.label_column):
+        parser.error("--code_column and --label_column are required with --csv")
+
+    main(local_index=args.local_index,
+         obo=args.obo,
+         csv_files=args.csv,
+         prefix=args.prefix,
+         code_column=args.code_column,
+         label_column=args.label_column,
+         description_column=args.description_column,
+         delimiter=args.delimiter)
@@ -1,14 +1,29 @@
 '''
-Cleans a datafile column that contains codes. 
+Cleans a datafile column that contains codes.
 Expects a column with data similar to: '|HP:0004323|HP:0000234|''|HP:0004323||HP:0000234|'
+
+The file is streamed in chunks and each chunk is cleaned with vectorized string
+operations, so memory use is bounded by the chunksize rather than the file size.
+With --workers the file is split into record-aligned byte ranges that are cleaned
+in a process pool, and the partial outputs are merged back in the original order.
+Each worker streams its range in chunks too. Compressed or non-csv files can't be split
+into byte ranges and are always streamed in a single process.
 '''
 
 import argparse
 import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from dbt_pipeline_utils.scripts.helpers.general import *
 from dbt_pipeline_utils.scripts.helpers.common import *
 from dbt_pipeline_utils import logger
 
+# Check format STRING:12345 (uppercase string, colon, string)
+VALID_CODE_RE = re.compile(r'[A-Z]+:.*?')
+
+DEFAULT_CHUNKSIZE = 500_000
+
 def clean_codes(codes, curies):
     # TODO: Split and strip whitespace on each code, before joining back
 
@@ -23,37 +38,175 @@ def clean_codes(codes, curies):
 
 def is_valid_format(code):
     # Check format STRING:12345 (uppercase string, colon, string)
-    return bool(re.fullmatch(r'[A-Z]+:.*?', code))
+    return bool(VALID_CODE_RE.fullmatch(code))
 
 def create_flag_column(codes):
     # Check if each code matches the valid format
     return [is_valid_format(code) for code in codes.split('|') if code.strip()]
 
-def main(df,column,curies):
-    df = read_file(df)
-    curies = curies.split(",")
+def compile_curies(curies):
+    """
+    One alternation over all curies, longest first. Each match is rewritten to '|CURIE:',
+    consuming at most one existing colon, the same result as clean_codes' per-curie replaces.
+    Differs from clean_codes only when one curie is a prefix of another (HP, HPO), where the
+    chained replaces would split the longer prefix ('HP:O:').
+    """
+    alternation = "|".join(re.escape(c) for c in sorted(set(curies), key=len, reverse=True) if c)
+    if not alternation:
+        return None
+    return re.compile(f"({alternation}):?")
+
+def clean_code_series(codes, curies_re):
+    """Vectorized clean_codes over a whole column. Missing values are treated as empty."""
+    codes = codes.fillna("").astype(str)
+
+    if curies_re is not None:
+        codes = codes.str.replace(curies_re, r"|\1:", regex=True)  # Ensure codes are separated by the |
+    codes = codes.str.replace(" ", "", regex=False)  # Whitespace
+    codes = codes.str.replace("''", "", regex=False).str.replace('"', "", regex=False)  # Quotations
+    codes = codes.str.replace("Ê", "", regex=False)  # Sp characters
+    codes = codes.str.replace("|||", "|", regex=False).str.replace("||", "|", regex=False)  # Multiple bars
+    return codes.str.strip("|")  # Leading and trailing bars
+
+def flag_code_series(cleaned):
+    """
+    create_flag_column over a whole column. Returns (correct_format, has_invalid):
+    correct_format holds the same '[True, False]' text the list column is written as,
+    has_invalid marks rows with at least one code that is not in the valid format.
+    """
+    import pandas as pd
+
+    flags = [create_flag_column(codes) for codes in cleaned]
+
+    correct_format = pd.Series([str(f) for f in flags], index=cleaned.index)
+    has_invalid = pd.Series([not all(f) for f in flags], index=cleaned.index)
+    return correct_format, has_invalid
+
+def clean_chunk(chunk, column, curies_re):
+    """
+    Cleans and flags one chunk. Returns the output rows and the questionable rows.
+
+    Code columns repeat the same values heavily, so each distinct value is cleaned
+    and flagged once and the results are mapped back onto the rows.
+    """
+    import pandas as pd
+
+    positions, uniques = pd.factorize(chunk[column].fillna(""))
+
+    cleaned = clean_code_series(pd.Series(uniques), curies_re)
+    correct_format, has_invalid = flag_code_series(cleaned)
+
+    t = pd.DataFrame({
+        'cleaned_col': cleaned.to_numpy()[positions],
+        'correct_format': correct_format.to_numpy()[positions],
+    }, index=chunk.index)
+    return t, t[has_invalid.to_numpy()[positions]]
+
+def clean_range(filepath, header_end, start, end, column, curies, chunksize, partial_output):
+    """
+    Worker for the parallel mode. Cleans the rows in bytes [start, end) of the file and
+    writes them, without a header, to partial_output.
+    Returns the number of rows cleaned and the questionable rows, indexed within the range.
+    """
+    import pandas as pd
+    from dbt_pipeline_utils.scripts.helpers.csv_ranges import open_range
+
+    curies_re = compile_curies(curies.split(","))
+
+    rows = 0
+    questionable = []
+    with open_range(filepath, header_end, start, end) as data, \
+            open(partial_output, "w", encoding="utf-8", newline="") as f:
+        for chunk in pd.read_csv(data, usecols=[column], dtype=str, chunksize=chunksize):
+            t, q = clean_chunk(chunk, column, curies_re)
+            t.to_csv(f, index=False, header=False)
+            rows += len(t)
+            if len(q):
+                questionable.append(q)
 
-    df['cleaned_col'] = df[column].apply(lambda x: clean_codes(x, curies))
-    df['correct_format'] = df['cleaned_col'].apply(create_flag_column)
+    return rows, (pd.concat(questionable) if questionable else None)
 
-    t=df[['cleaned_col','correct_format']]
-    t.to_csv('col_clean.csv', index=False)
+def main_parallel(df, column, curies, output, chunksize, workers):
+    import pandas as pd
+    from dbt_pipeline_utils.scripts.helpers.csv_ranges import record_aligned_ranges
+
+    header_end, ranges = record_aligned_ranges(df, workers)
+    logger.debug(f"Cleaning {len(ranges)} byte ranges using {workers} workers")
+
+    questionable = []
+    with tempfile.TemporaryDirectory(dir=Path(output).resolve().parent) as tmp_dir:
+        partials = [Path(tmp_dir) / f"part_{i}.csv" for i in range(len(ranges))]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(clean_range, df, header_end, start, end, column, curies, chunksize, partial)
+                for (start, end), partial in zip(ranges, partials)
+            ]
+            results = [future.result() for future in futures]
+
+        # Merge the partial outputs, and shift the questionable rows to file row numbers, in order.
+        with open(output, "w", encoding="utf-8", newline="") as out:
+            pd.DataFrame(columns=['cleaned_col', 'correct_format']).to_csv(out, index=False)
+            row_offset = 0
+            for partial, (rows, q) in zip(partials, results):
+                with open(partial, "r", encoding="utf-8", newline="") as f:
+                    shutil.copyfileobj(f, out)
+                if q is not None:
+                    q.index = q.index + row_offset
+                    questionable.append(q)
+                row_offset += rows
+
+    return questionable
+
+def main_stream(df, column, curies, output, chunksize):
+    import pandas as pd
+
+    curies_re = compile_curies(curies.split(","))
+
+    questionable = []
+    reader = read_file(df, columns=[column], dtype=str, chunksize=chunksize)
+
+    for i, chunk in enumerate(reader):
+        t, q = clean_chunk(chunk, column, curies_re)
+
+        # Write the cleaned rows as they are produced
+        t.to_csv(output, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+
+        if len(q):
+            questionable.append(q)
+        logger.debug(f"Cleaned rows {chunk.index[0]}-{chunk.index[-1]}")
+
+    return questionable
+
+def main(df, column, curies, output='col_clean.csv', chunksize=DEFAULT_CHUNKSIZE, workers=1):
+    import pandas as pd
+
+    if workers > 1 and split_compression(df) != (".csv", None):
+        logger.warning(f"{df} can't be split into byte ranges, cleaning it in a single process")
+        workers = 1
+
+    if workers > 1:
+        questionable = main_parallel(df, column, curies, output, chunksize, workers)
+    else:
+        questionable = main_stream(df, column, curies, output, chunksize)
 
     # Catch all codes that might not be cleaned properly
-    questionable = df[df['correct_format'].apply(lambda x: not all(x))]
-    if len(questionable)>=1:
-        logger.warning(f': {questionable[['cleaned_col','correct_format']]}')
+    if questionable:
+        logger.warning(f': {pd.concat(questionable)}')
 
-    logger.info('Clean codes are returned')
-    return df
+    logger.info(f'Clean codes are written to {output}')
+    return output
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Get metadata for a code using the available locutus OntologyAPI connection.")
-    
+
     parser.add_argument("-df", "--data_file", required=True, help="File containing the codes requiring metadata. Format: 'path/to/datafile.csv'")
     parser.add_argument("-c", "--column", required=True, help="Column name containing the codes requiring metadata. The utils can do some amount of cleaning. # Format: 'ExactFieldName'")
     parser.add_argument("-o", "--ontologies", required=True, help="List of ontology prefixes")
+    parser.add_argument("-out", "--output", required=False, default='col_clean.csv', help="The output filename. Path from root.")
+    parser.add_argument("-cs", "--chunksize", required=False, default=DEFAULT_CHUNKSIZE, type=int, help="Rows read and cleaned at a time")
+    parser.add_argument("-w", "--workers", required=False, default=1, type=int, help="Processes used to clean the file. 1 streams it in a single process.")
 
     args = parser.parse_args()
 
-    main(df=args.data_file, column=args.column, curies=args.ontologies)
+    main(df=args.data_file, column=args.column, curies=args.ontologies, output=args.output, chunksize=args.chunksize, workers=args.workers)
@@ -2,92 +2,264 @@
 Get metadata for a code using the search_dragon.
 
 python src/dbt_pipeline_utils/scripts/code_api_search.py -ak 'HP:0000828|HP:0000828' -o "HPO, HP" -f 'annotations3.csv'
+
+Codes can also be streamed from a csv column, e.g. the cleaned_col of clean_code_col's output.
+Each distinct code is searched once and the results are written out for every row it is on.
+
+python src/dbt_pipeline_utils/scripts/code_api_search.py -df 'col_clean.csv' -c 'cleaned_col' -o "HPO, HP" -f 'annotations3.csv'
+
+With --local_index, codes are answered from a local ontology index first (see
+build_ontology_index.py) and only the misses are searched in the APIs. Local rows have api 'local'.
+
+python src/dbt_pipeline_utils/scripts/code_api_search.py -df 'col_clean.csv' -c 'cleaned_col' -li 'ontologies.sqlite' -f 'annotations3.csv'
 """
 
 import argparse
 import csv
 from dbt_pipeline_utils.scripts.helpers.general import *
 from dbt_pipeline_utils.scripts.helpers.common import *
+from dbt_pipeline_utils.scripts.helpers.concurrent_search import ConcurrentSearch, build_limiters
+from dbt_pipeline_utils.scripts.helpers.search_cache import SearchCache, DEFAULT_TTL
+from dbt_pipeline_utils.scripts.helpers.prefix_index import load_prefix_index
+from dbt_pipeline_utils.scripts.helpers.ontology_index import OntologyIndex
 from dbt_pipeline_utils import logger
-from search_dragon.search import run_search
 from pathlib import Path
 
 def get_onto_data():
-    lookup_path = Path(dbt_pipeline_utils.__file__).resolve().parent / 'data/refs/ftd_ontology_lookup.csv'
-    ori = pd.read_csv(lookup_path)
-    # Create a dictionary from the DataFrame
-    onto_data = {}
-    for _, row in ori.iterrows():
-        key = row[0]
-        value = row[1]
-        onto_data[key] = value
-
-    return onto_data
-
-def main(codes, ontologies, filepath, results_per_page, start_index):
-    annotations = {}
+    """curie -> system, from data/refs/ftd_ontology_lookup.csv."""
+    return load_prefix_index().systems
+
+APIS = ['ols', 'ols2', 'umls']
+LOCAL_SOURCE = 'local'
+
+CSV_HEADER = ["api","searched_code","response_code","display","description","system","code_iri","ontology_prefix"]
+
+def api_keywords(keyword):
+    """Returns {api: keyword} with the ontology prefix each API expects."""
+    index = load_prefix_index()
+    return {api: index.to_api([keyword], api)[0] for api in APIS}
+
+def result_rows(source, keyword, result):
+    """Formats one api's search result into output csv rows."""
+    if result and result.get('results'):
+        for entry in result['results']:
+            code = entry.get('code', "No results")
+            display = entry.get('display', "No results")
+            description = entry.get('description', "No results")
+            system = entry.get('system', "No results")
+            code_iri = entry.get('code_iri', "No results")
+            ontology_prefix = entry.get('ontology_prefix', "No results")
+            yield [source, keyword, code, display, description, system, code_iri, ontology_prefix]
+    else:
+        yield [source, keyword, "No results", "No results", "No results", "No results", "No results", "No results"]
+
+FILE_CSV_HEADER = ["row", "input_code", *CSV_HEADER]
+
+DEFAULT_CHUNKSIZE = 100_000
+
+def normalize_code(code):
+    """Strips whitespace, uppercases the prefix and resolves aliases (HPO: -> HP:), so duplicates collapse."""
+    return load_prefix_index().normalize([code])[0]
+
+def iter_column_codes(data_file, column, delimiter="|", chunksize=DEFAULT_CHUNKSIZE):
+    """Streams (row, [codes]) from a csv column. A cell can hold several delimited codes."""
+    reader = read_file(data_file, columns=[column], dtype=str, chunksize=chunksize)
+    for chunk in reader:
+        for row, cell in zip(chunk.index, chunk[column]):
+            if isinstance(cell, str):
+                yield row, [c.strip() for c in cell.split(delimiter) if c.strip()]
+
+def search_engine(ontology_param, results_per_page, start_index,
+                  concurrency=None, rate=None, retries=2, timeout=60, run_search=None,
+                  use_cache=True, cache_path=None, cache_ttl=DEFAULT_TTL, offline=False):
+    """
+    Returns (engine, cache) for the search options shared by main and main_file.
+
+    run_search: defaults to search_dragon's run_search. Pass a function with the same
+    signature to run offline.
+    use_cache: answer repeated searches from the on-disk response cache, see helpers/search_cache.py.
+    offline: only answer from the cache, codes that are not cached get "No results".
+    """
+    if run_search is None and not offline:
+        # Imported here so --help does not load the search stack.
+        from search_dragon.search import run_search
+
     onto_data = get_onto_data()
 
+    def search(api, keyword):
+        return run_search(onto_data, keyword, ontology_param, [api], results_per_page, start_index)
+
+    cache = SearchCache(cache_path, ttl=cache_ttl) if use_cache or offline else None
+
+    engine = ConcurrentSearch(
+        search,
+        limiters=build_limiters(concurrency=concurrency, per_second=rate),
+        retries=retries,
+        timeout=timeout,
+        cache=cache,
+        cache_params=(ontology_param, results_per_page, start_index),
+        offline=offline,
+    )
+    return engine, cache
+
+def keyword_requests(codes):
+    # Prefix conversions are applied to the whole list at once, per api.
+    codes = list(codes)
+    index = load_prefix_index()
+    api_codes = {api: index.to_api(codes, api) for api in APIS}
+
+    for i, keyword in enumerate(codes):
+        logger.info(f"Requesting: {keyword}")
+        for api in APIS:
+            yield keyword, api, api_codes[api][i]
+
+def resolve_locally(codes, local_index):
+    """Returns ({code: result} answered by the local index, [codes left for the APIs])."""
+    if not local_index:
+        return {}, list(codes)
+
+    index = OntologyIndex(local_index)
+    try:
+        found = index.resolve_many(codes)
+    finally:
+        index.close()
+    misses = [code for code in codes if code not in found]
+    logger.info(f"Local index answered {len(found)} codes, {len(misses)} left for the APIs")
+    return found, misses
+
+def main(codes, ontologies, filepath, results_per_page, start_index, local_index=None, **search_options):
+    """
+    Searches every code in ols, ols2 and umls concurrently and writes each result to the
+    csv as soon as it arrives, so rows are in completion order.
+    local_index: path to a local ontology index, codes found there are not searched in the APIs.
+    search_options: see search_engine.
+    """
     codes = [c.strip() for c in codes.split("|")]
     ontology_param = [c.strip() for c in ontologies.split(",")]
 
-    for keyword in codes:
-        logger.info(f"Requesting: {keyword}")
-        annotations[keyword]={}
-
-        # TODO: Automate conversions.
-        # Apply Ontology prefix conversions when necessary.
-        ols_keyword = keyword 
-        umls_keyword = keyword.replace('HP:', 'HPO:')
-        if keyword.startswith('HP:'):
-            ols_keyword = keyword
-            umls_keyword = keyword.replace('HP:', 'HPO:')
-        if keyword.startswith('HPO:'):
-            ols_keyword = keyword.replace('HPO:', 'HP:')
-            umls_keyword = keyword
-
-        annotations[keyword]['ols'] = run_search(onto_data, ols_keyword, ontology_param, ['ols'], results_per_page, start_index)
-        annotations[keyword]['ols2'] = run_search(onto_data, ols_keyword, ontology_param, ['ols2'], results_per_page, start_index)
-        annotations[keyword]['umls'] = run_search(onto_data, umls_keyword, ontology_param, ['umls'], results_per_page, start_index)
+    found, codes = resolve_locally(codes, local_index)
+
+    engine, cache = search_engine(ontology_param, results_per_page, start_index, **search_options) if codes else (None, None)
 
     # Format result and output to a CSV file
     with open(filepath, mode="w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
 
-        # Write header row (optional, depends on your data structure)
-        writer.writerow(["api","searched_code","response_code","display","description","system","code_iri","ontology_prefix"])
-
-        for keyword, results in annotations.items():
-            for source, result in results.items():
-                if result and result.get('results'):
-                    for entry in result['results']:
-                        source = source
-                        code = entry.get('code', "No results")
-                        display = entry.get('display', "No results")
-                        description = entry.get('description', "No results")
-                        system = entry.get('system', "No results")
-                        code_iri = entry.get('code_iri', "No results")
-                        ontology_prefix = entry.get('ontology_prefix', "No results")
-                        writer.writerow([source, keyword, code, display, description, system, code_iri, ontology_prefix])
-                else:
-                    writer.writerow([source, keyword, "No results", "No results", "No results", "No results", "No results", "No results"])
+        writer.writerow(CSV_HEADER)
+
+        for keyword, result in found.items():
+            writer.writerows(result_rows(LOCAL_SOURCE, keyword, result))
+
+        for keyword, source, result in engine.run(keyword_requests(codes)) if engine else ():
+            writer.writerows(result_rows(source, keyword, result))
+            csvfile.flush()
+
+    if cache is not None:
+        cache.close()
+
+def main_file(data_file, column, ontologies, filepath, results_per_page, start_index,
+              delimiter="|", chunksize=DEFAULT_CHUNKSIZE, local_index=None, **search_options):
+    """
+    Searches the codes in a csv column. The column is read twice, in chunks:
+     1. collect the distinct normalized codes, and search each one once
+     2. write the results for every row and code, in file order
+    Memory holds the distinct codes and their results, not the input rows.
+    local_index: path to a local ontology index, codes found there are not searched in the APIs.
+    search_options: see search_engine.
+    """
+    ontology_param = [c.strip() for c in ontologies.split(",")]
+
+    unique_codes = {}
+    rows = 0
+    index = load_prefix_index()
+    for _, codes in iter_column_codes(data_file, column, delimiter, chunksize):
+        rows += 1
+        for code in index.normalize(codes):
+            unique_codes.setdefault(code, None)
+    logger.info(f"{len(unique_codes)} distinct codes in {rows} rows of {data_file}")
+
+    found, misses = resolve_locally(list(unique_codes), local_index)
+
+    engine, cache = search_engine(ontology_param, results_per_page, start_index, **search_options) if misses else (None, None)
+
+    results = {code: [] for code in unique_codes}
+    for keyword, result in found.items():
+        results[keyword].extend(result_rows(LOCAL_SOURCE, keyword, result))
+    for keyword, source, result in engine.run(keyword_requests(misses)) if engine else ():
+        results[keyword].extend(result_rows(source, keyword, result))
+
+    if cache is not None:
+        cache.close()
+
+    # Results sorted by api, so every row lists them in the same order.
+    for code_rows in results.values():
+        code_rows.sort(key=lambda r: APIS.index(r[0]) if r[0] in APIS else -1)
+
+    with open(filepath, mode="w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+
+        writer.writerow(FILE_CSV_HEADER)
+
+        for row, codes in iter_column_codes(data_file, column, delimiter, chunksize):
+            for code, normalized in zip(codes, index.normalize(codes)):
+                for result_row in results[normalized]:
+                    writer.writerow([row, code, *result_row])
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Get metadata for a code using the available locutus OntologyAPI connection.")
     
-    parser.add_argument("-ak", "--all_keywords", required=True, help="A string value containing words to search with the API. Delimeter |")
+    keywords = parser.add_mutually_exclusive_group(required=True)
+    keywords.add_argument("-ak", "--all_keywords", help="A string value containing words to search with the API. Delimeter |")
+    keywords.add_argument("-df", "--data_file", help="A csv file with a column of codes to search. Format: 'path/to/datafile.csv'")
+    parser.add_argument("-c", "--column", required=False, help="Column in --data_file containing the codes. Format: 'ExactFieldName'")
+    parser.add_argument("-d", "--delimiter", required=False, default="|", help="Delimiter between codes in one --data_file cell")
+    parser.add_argument("-cs", "--chunksize", required=False, default=DEFAULT_CHUNKSIZE, type=int, help="Rows of --data_file read at a time")
     parser.add_argument("-o", "--ontologies", required=False, default='HP,HPO', help="A string value containing the ontology_prefixes to use in the searh")
     parser.add_argument("-f","--filepath",required=False, default = 'annotations.csv', help="The output filename. Path from root.",)
     parser.add_argument("-r", "--results_per_page", required=False, default = 1, help="How many pages should the API return per request")
     parser.add_argument("-s", "--start_index", required=False, default = 1, help="Which page should be returned")
     parser.add_argument("-i", "--input_type", required=False, default = 1, help="Which page should be returned")
+    parser.add_argument("-cc", "--concurrency", required=False, type=int, help="Max requests in flight per API. Defaults per API, see helpers/concurrent_search.py")
+    parser.add_argument("-rl", "--rate_limit", required=False, type=float, help="Max requests started per second per API. Defaults per API")
+    parser.add_argument("--retries", required=False, default=2, type=int, help="Retries for a failed or timed out request")
+    parser.add_argument("--timeout", required=False, default=60, type=float, help="Seconds before a request is abandoned and retried")
+    parser.add_argument("--no_cache", required=False, action="store_true", help="Do not read or write the search response cache")
+    parser.add_argument("--cache_path", required=False, help="Search response cache file. Defaults to $DBT_PIPELINE_UTILS_SEARCH_CACHE or a file in the system temp dir")
+    parser.add_argument("--cache_ttl_days", required=False, default=DEFAULT_TTL / 86400, type=float, help="Cached responses older than this are searched again")
+    parser.add_argument("--offline", required=False, action="store_true", help="Only answer from the search response cache, no API requests")
+    parser.add_argument("-li", "--local_index", required=False, help="Local ontology index to answer from before the APIs, see build_ontology_index.py")
 
     args = parser.parse_args()
 
-    main(codes=args.all_keywords,
-         ontologies=args.ontologies,
-         filepath=args.filepath,
-         results_per_page=args.results_per_page,
-         start_index=args.start_index
-         )
+    search_options = dict(
+        concurrency=args.concurrency,
+        rate=args.rate_limit,
+        retries=args.retries,
+        timeout=args.timeout,
+        use_cache=not args.no_cache,
+        cache_path=args.cache_path,
+        cache_ttl=args.cache_ttl_days * 86400,
+        offline=args.offline,
+        local_index=args.local_index,
+    )
+
+    if args.data_file:
+        if not args.column:
+            parser.error("--column is required with --data_file")
+        main_file(data_file=args.data_file,
+                  column=args.column,
+                  ontologies=args.ontologies,
+                  filepath=args.filepath,
+                  results_per_page=args.results_per_page,
+                  start_index=args.start_index,
+                  delimiter=args.delimiter,
+                  chunksize=args.chunksize,
+                  **search_options)
+    else:
+        main(codes=args.all_keywords,
+             ontologies=args.ontologies,
+             filepath=args.filepath,
+             results_per_page=args.results_per_page,
+             start_index=args.start_index,
+             **search_options)
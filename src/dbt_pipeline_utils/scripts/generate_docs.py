@@ -4,6 +4,7 @@ from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generation_main
     generate_model_docs, generate_ftd_model_docs, generate_tgt_model_docs, generate_run_script
 )
 from dbt_pipeline_utils.scripts.helpers.general import *
+from dbt_pipeline_utils.scripts.helpers import general
 from dbt_pipeline_utils.scripts.helpers.common import *
 from dbt_pipeline_utils.scripts.helpers.validate_study_config import *
 from dbt_pipeline_utils.scripts.helpers.factory_functions import *
@@ -45,9 +46,11 @@ def generate_ftd_study_yaml(paths, project_id):
     write_file(paths['ftd_study_yml_path'], dbt_config, overwrite=True)
 
 
-def main(study_id, project_id, tgt_id, src_data_path):
+def main(study_id, project_id, tgt_id, src_data_path, profile=False, workers=None, csv_engine=None):
 
     logger.info(f'Generating the {project_id} {study_id} dbt pipeline...')
+    if csv_engine:
+        general.CSV_ENGINE = csv_engine
     # Set paths
     paths = get_paths(study_id, project_id, tgt_id, src_data_path)
     # If project dirs don't exist create them. 
@@ -88,11 +91,16 @@ def main(study_id, project_id, tgt_id, src_data_path):
     validate_study_config(study_config, paths["src_data_dir"])
     logger.debug("End validation of study config")
 
+    profiles = None
+    if profile and src_df_objs:
+        logger.info("Profiling src data files...")
+        profiles = src_df_objs[0].profile_data_files(workers=workers)
+
     for df_obj in src_df_objs:
 
-        generate_model_docs(df_obj)
+        generate_model_docs(df_obj, profiles)
 
-        generate_ftd_model_docs(df_obj)
+        generate_ftd_model_docs(df_obj, profiles)
         
         generate_basic_dbt_project_yml(df_obj.paths["dbtp_catalog_dir"], "catalog", df_obj.pipeline_db)
 
@@ -120,6 +128,23 @@ if __name__ == "__main__":
         help="Path to the directory containing src data files. If not set, defaults to the {dbt project}/data path",
     )
 
+    parser.add_argument(
+        "--profile",
+        required=False,
+        action="store_true",
+        help="Profile the src data files and fill empty min/max/enumerations in the stg data dictionaries",
+    )
+
+    parser.add_argument("-w", "--workers", required=False, type=int, help="Data files profiled at once. Defaults to the number of cpus")
+
+    parser.add_argument(
+        "--csv_engine",
+        required=False,
+        choices=["c", "pyarrow", "python"],
+        help="pandas parser for the csv data dictionaries. pyarrow is multithreaded, it needs the pyarrow package",
+    )
+
     args = parser.parse_args()
 
-    main(study_id=args.study_id, tgt_id=args.tgt_id, src_data_path=args.filepath)
+    main(study_id=args.study_id, tgt_id=args.tgt_id, src_data_path=args.filepath, profile=args.profile, workers=args.workers,
+         csv_engine=args.csv_engine)
@@ -0,0 +1,200 @@
+'''
+Profiles the columns of src data files in one chunked pass, in bounded memory, so files
+larger than RAM can be profiled. Per column it keeps:
+ - row and null counts
+ - min/max, for columns where every value is numeric
+ - an approximate distinct count (HyperLogLog, ~1% error at the default precision)
+ - the top-K most frequent values. Exact while a column has fewer distinct values than the
+   tracked capacity, approximate near the cutoff beyond it.
+
+Summaries are used to fill min, max and enumerations in the stg data dictionaries, see
+DocGeneration.generate_stg_dds.
+'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dbt_pipeline_utils import logger
+
+DEFAULT_CHUNKSIZE = 200_000
+DEFAULT_TOP_K = 20
+
+# Columns with at most this many distinct values get their values listed as enumerations.
+DEFAULT_MAX_ENUMERATIONS = 20
+
+
+class HyperLogLog():
+    def __init__(self, p=14):
+        import numpy as np
+
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """hashes: uint64 numpy array, e.g. from pd.util.hash_pandas_object."""
+        import numpy as np
+
+        if not len(hashes):
+            return
+        p = np.uint64(self.p)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # The guard bit caps the rank at 64 - p + 1 when the remaining bits are all 0.
+        w = (hashes << p) | np.uint64(1 << (self.p - 1))
+
+        # Leading zeros by binary search, exact where float log2 would round.
+        leading = np.zeros(len(w), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            top_clear = w < np.uint64(1 << (64 - shift))
+            leading[top_clear] += shift
+            w[top_clear] <<= np.uint64(shift)
+
+        np.maximum.at(self.registers, idx, leading + 1)
+
+    def merge(self, other):
+        import numpy as np
+
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        import numpy as np
+
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate for small cardinalities.
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class TopK():
+    """Frequent value counts, trimmed to capacity after each chunk."""
+
+    def __init__(self, k=DEFAULT_TOP_K, capacity=None):
+        self.k = k
+        self.capacity = capacity or k * 50
+        self.counts = {}
+        self.truncated = False
+
+    def add_counts(self, counts):
+        """counts: {value: count}, e.g. a chunk's value_counts()."""
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > self.capacity:
+            keep = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+            self.counts = dict(keep)
+            self.truncated = True
+
+    def top(self):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:self.k]
+
+
+class ColumnProfile():
+    def __init__(self, top_k=DEFAULT_TOP_K):
+        self.rows = 0
+        self.nulls = 0
+        self.numeric = True
+        self.min = None
+        self.max = None
+        self.hll = HyperLogLog()
+        self.top_k = TopK(top_k)
+
+    def add(self, values):
+        """values: a string dtype pandas Series, one chunk of the column."""
+        import pandas as pd
+
+        total = len(values)
+        values = values.dropna()
+        self.rows += total
+        self.nulls += total - len(values)
+        self.top_k.add_counts(values.value_counts(sort=False).to_dict())
+        self.hll.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+        if self.numeric and len(values):
+            numbers = pd.to_numeric(values, errors="coerce")
+            if numbers.isna().any():
+                self.numeric = False
+                self.min = self.max = None
+            else:
+                low, high = numbers.min(), numbers.max()
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+
+    def summary(self):
+        distinct = self.hll.estimate()
+        if not self.top_k.truncated:
+            # Every value was counted, the exact count beats the estimate.
+            distinct = len(self.top_k.counts)
+        numeric = self.numeric and self.rows > self.nulls
+        return {
+            "rows": self.rows,
+            "nulls": self.nulls,
+            "numeric": numeric,
+            "min": _plain_number(self.min) if numeric else None,
+            "max": _plain_number(self.max) if numeric else None,
+            "approx_distinct": distinct,
+            "exact_values": not self.top_k.truncated,
+            "top_values": self.top_k.top(),
+        }
+
+
+def _plain_number(value):
+    """numpy scalar -> int or float, 3.0 -> 3."""
+    value = value.item() if hasattr(value, "item") else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def profile_file(filepath, chunksize=DEFAULT_CHUNKSIZE, top_k=DEFAULT_TOP_K):
+    """Returns {column: summary} for a data file, read chunksize rows at a time."""
+    from dbt_pipeline_utils.scripts.helpers.general import read_file
+
+    profiles = {}
+    for chunk in read_file(filepath, dtype=str, chunksize=chunksize):
+        for column in chunk.columns:
+            if column not in profiles:
+                profiles[column] = ColumnProfile(top_k)
+            profiles[column].add(chunk[column])
+
+    logger.debug(f"Profiled {len(profiles)} columns of {filepath}")
+    return {column: profile.summary() for column, profile in profiles.items()}
+
+
+def profile_files(filepaths, workers=None, chunksize=DEFAULT_CHUNKSIZE, top_k=DEFAULT_TOP_K):
+    """
+    filepaths: {table_id: path}. Profiles the files in parallel, one process per file.
+    Returns {table_id: {column: summary}}, files that fail are logged and left out.
+    """
+    workers = workers or min(len(filepaths), os.cpu_count() or 1) or 1
+    profiles = {}
+
+    if workers == 1:
+        for table_id, filepath in filepaths.items():
+            try:
+                profiles[table_id] = profile_file(filepath, chunksize, top_k)
+            except Exception as e:
+                logger.error(f"Could not profile {filepath}: {e}")
+        return profiles
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            table_id: pool.submit(profile_file, filepath, chunksize, top_k)
+            for table_id, filepath in filepaths.items()
+        }
+        for table_id, future in futures.items():
+            try:
+                profiles[table_id] = future.result()
+            except Exception as e:
+                logger.error(f"Could not profile {filepaths[table_id]}: {e}")
+    return profiles
+
+
+def enumerations(summary, max_enumerations=DEFAULT_MAX_ENUMERATIONS):
+    """The column's values as a ; delimited enumerations string, or None for numeric or high cardinality columns."""
+    if summary["numeric"] or not summary["exact_values"]:
+        return None
+    distinct = summary["approx_distinct"]
+    if not summary["top_values"] or distinct > max_enumerations or distinct > len(summary["top_values"]):
+        return None
+    return ";".join(sorted(str(value) for value, _ in summary["top_values"]))
@@ -1,3 +1,10 @@
+import os
+from pathlib import Path
+
+# Per-user directory for caches derived from local files (prefix index, record index).
+# They are loaded without checks, so they never go in a directory other users can write to.
+USER_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "dbt_pipeline_utils"
+
 # Map common data types to PostgreSQL types
 type_mapping = {
     "string": "text",
@@ -20,6 +27,7 @@ DD_FORMATS = {
         "enumerations": None,
         "comment": None,
         "src_variable_name": "src_variable_name",  # Generated, for stg dds
+        "tests": None,
     },
     # Generated/intermediate pipeline dds, will follow the same format (pipeline_format)
     "pipeline_format": {
@@ -0,0 +1,192 @@
+'''
+Runs ontology API lookups concurrently, with a concurrency cap and a request rate
+limit per API, retries with backoff, and a timeout per attempt.
+
+The search function is passed in, so the engine can run offline with a stub in place
+of search_dragon's run_search. With a cache (see search_cache.py) hits are returned
+without a request, and offline=True answers from the cache only.
+'''
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError, wait
+from dbt_pipeline_utils import logger
+
+# UMLS allows 20 requests/second per IP; OLS does not publish a limit, keep it polite.
+DEFAULT_API_LIMITS = {
+    "ols": {"concurrency": 4, "per_second": 10},
+    "ols2": {"concurrency": 4, "per_second": 10},
+    "umls": {"concurrency": 4, "per_second": 15},
+}
+DEFAULT_LIMITS = {"concurrency": 2, "per_second": 5}
+
+
+class RateLimiter():
+    """Spaces out calls so no more than per_second start in any second. Thread safe."""
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second else 0
+        self.lock = threading.Lock()
+        self.next_start = 0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(self.next_start, now)
+            self.next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class ApiLimiter():
+    """Concurrency cap and rate limit for one API."""
+
+    def __init__(self, concurrency, per_second):
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.rate = RateLimiter(per_second)
+
+
+def build_limiters(api_limits=None, concurrency=None, per_second=None):
+    """
+    api_limits: {api: {"concurrency": n, "per_second": n}}, defaults to DEFAULT_API_LIMITS.
+    concurrency/per_second, when set, override the value for every api.
+    """
+    api_limits = api_limits or DEFAULT_API_LIMITS
+    limiters = {}
+    for api, limits in api_limits.items():
+        limiters[api] = ApiLimiter(concurrency or limits["concurrency"], per_second or limits["per_second"])
+    return limiters
+
+
+class ConcurrentSearch():
+    """
+    Runs search(api, keyword) calls across keywords and APIs in parallel.
+
+    Each call waits for a free slot and the rate limiter of its API. An attempt fails when no
+    slot frees up within `timeout` seconds, or its call raises or runs past `timeout`. Failed
+    attempts are retried up to `retries` times with exponential backoff.
+    A timed out call can not be interrupted. It runs on in a daemon thread, so it never keeps
+    the interpreter from exiting, and keeps its API slot until it returns. The retry waits on
+    that call again instead of starting another one.
+
+    cache: a SearchCache, cache_params are the extra key parts (ontologies, page params).
+    Successful responses are stored. offline=True never calls search, misses yield None.
+    """
+
+    def __init__(self, search, limiters=None, retries=2, timeout=60, backoff=1.0,
+                 cache=None, cache_params=(), offline=False):
+        self.search = search
+        self.limiters = limiters or build_limiters()
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.cache = cache
+        self.cache_params = cache_params
+        self.offline = offline
+
+    def _limiter(self, api):
+        if api not in self.limiters:
+            self.limiters.setdefault(api, ApiLimiter(DEFAULT_LIMITS["concurrency"], DEFAULT_LIMITS["per_second"]))
+        return self.limiters[api]
+
+    def _call(self, api, keyword):
+        """Runs search in a daemon thread, returns its Future."""
+        call = Future()
+
+        def run():
+            call.set_running_or_notify_cancel()
+            try:
+                call.set_result(self.search(api, keyword))
+            except BaseException as e:
+                call.set_exception(e)
+
+        threading.Thread(target=run, name="search_call", daemon=True).start()
+        return call
+
+    def _start(self, api, keyword):
+        """Starts a call once the API has a free slot, raises TimeoutError when none frees up in time."""
+        limiter = self._limiter(api)
+        if not limiter.slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"no free {api} slot")
+        try:
+            limiter.rate.wait()
+            call = self._call(api, keyword)
+        except BaseException:
+            limiter.slots.release()
+            raise
+        # The slot is held until the call finishes, not when an attempt stops waiting on it,
+        # so abandoned calls still count against the API's concurrency cap.
+        call.add_done_callback(lambda _: limiter.slots.release())
+        return call
+
+    def run_one(self, api, keyword):
+        """Returns the search result, or None when every attempt failed."""
+        running = None  # the call of a timed out attempt, still holding its slot
+        for attempt in range(self.retries + 1):
+            if running is not None and running.done() and running.exception() is not None:
+                # The abandoned call failed in the meantime, start a new one.
+                running = None
+            call = running
+            try:
+                if call is None:
+                    call = self._start(api, keyword)
+                result = call.result(timeout=self.timeout)
+            except TimeoutError:
+                running = call if call is not None and not call.done() else None
+                logger.warning(f"{api} search for {keyword} timed out after {self.timeout}s (attempt {attempt + 1})")
+            except Exception as e:
+                running = None
+                logger.warning(f"{api} search for {keyword} failed (attempt {attempt + 1}): {e}")
+            else:
+                # A cache write that fails is not a failed search, it must not trigger a retry.
+                if self.cache is not None:
+                    try:
+                        self.cache.set(api, keyword, result, self.cache_params)
+                    except Exception as e:
+                        logger.warning(f"Could not cache the {api} search for {keyword}: {e}")
+                return result
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+
+        logger.error(f"{api} search for {keyword} failed after {self.retries + 1} attempts")
+        return None
+
+    def run(self, requests, max_workers=None):
+        """
+        requests: iterable of (key, api, keyword). key is passed back untouched, e.g. the
+        code as it was given before any prefix conversion.
+        Yields (key, api, result) as each search completes. Requests are consumed lazily,
+        only a few per worker are queued at a time.
+        """
+        max_workers = max_workers or sum(limiter.concurrency for limiter in self.limiters.values())
+        requests = iter(requests)
+        pending = {}
+        ready = []  # answered from the cache
+
+        # Calls run in their own daemon threads, see _call, so the request threads can stop
+        # waiting on a call that hangs.
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search") as pool:
+
+            def fill():
+                for key, api, keyword in requests:
+                    cached = None
+                    if self.cache is not None:
+                        cached = self.cache.get(api, keyword, self.cache_params, allow_expired=self.offline)
+                    if cached is not None or self.offline:
+                        ready.append((key, api, cached))
+                    else:
+                        pending[pool.submit(self.run_one, api, keyword)] = (key, api)
+                    if len(pending) + len(ready) >= max_workers * 4:
+                        break
+
+            fill()
+            while pending or ready:
+                while ready:
+                    yield ready.pop(0)
+                if pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key, api = pending.pop(future)
+                        yield key, api, future.result()
+                fill()
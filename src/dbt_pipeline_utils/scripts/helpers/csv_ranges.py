@@ -0,0 +1,187 @@
+'''
+Splits csv files into byte ranges that start and end on record boundaries, so each
+range can be parsed on its own, e.g. by a worker process.
+
+A newline only ends a record when it is outside a quoted field, i.e. when the number
+of quote characters before it is even. Escaped quotes ("") keep the count even.
+'''
+
+import io
+import mmap
+import os
+
+BLOCK_SIZE = 8 * 1024 * 1024
+QUOTE = ord('"')
+NEWLINE = ord('\n')
+
+
+def _record_end(block, start, quotes_before):
+    """
+    Returns the offset just past the first record-ending newline in block at or after start,
+    or None. quotes_before is the number of quotes in the file before block[0].
+    """
+    pos = block.find(b"\n", start)
+    quotes = quotes_before + block.count(b'"', 0, pos if pos != -1 else len(block))
+    while pos != -1:
+        if quotes % 2 == 0:
+            return pos + 1
+        next_pos = block.find(b"\n", pos + 1)
+        quotes += block.count(b'"', pos + 1, next_pos if next_pos != -1 else len(block))
+        pos = next_pos
+    return None
+
+
+def record_boundaries(filepath, targets):
+    """
+    For each byte offset in targets (ascending), returns the offset of the first record
+    start at or after it. Offsets past the last record map to the file size.
+    """
+    size = os.path.getsize(filepath)
+    boundaries = []
+    pending = list(targets)
+
+    with open(filepath, "rb") as f:
+        offset = 0
+        quotes = 0
+        carry = b""
+        while pending:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            # carry holds the tail of the previous block that did not contain a record end yet.
+            data = carry + block
+            data_offset = offset - len(carry)
+
+            while pending and pending[0] < data_offset + len(data):
+                start = max(pending[0] - data_offset, 0)
+                end = _record_end(data, start, quotes)
+                if end is None:
+                    break
+                boundaries.append(data_offset + end)
+                pending.pop(0)
+
+            if pending and pending[0] < data_offset + len(data):
+                # The record spanning the target continues into the next block.
+                keep_from = max(pending[0] - data_offset, 0)
+                quotes += data.count(b'"', 0, keep_from)
+                carry = data[keep_from:]
+            else:
+                quotes += data.count(b'"')
+                carry = b""
+            offset += len(block)
+
+    return boundaries + [size] * len(pending)
+
+
+def record_aligned_ranges(filepath, parts):
+    """
+    Splits the data rows of a csv into at most `parts` (start, end) byte ranges.
+    Returns (header_end, ranges), header_end is the offset where the first data row starts.
+    """
+    size = os.path.getsize(filepath)
+    header_end = record_boundaries(filepath, [0])[0]
+
+    step = max((size - header_end) // max(parts, 1), 1)
+    targets = [header_end + step * i for i in range(1, parts)]
+    starts = [header_end] + record_boundaries(filepath, targets)
+
+    ranges = []
+    for start, end in zip(starts, starts[1:] + [size]):
+        if end > start:
+            ranges.append((start, end))
+    return header_end, ranges
+
+
+def read_range(filepath, start, end):
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+class _SpansReader(io.RawIOBase):
+    """Reads the (start, end) byte spans of a file one after the other, as one stream."""
+
+    def __init__(self, filepath, spans):
+        self._file = open(filepath, "rb")
+        self._spans = [(start, end) for start, end in spans if end > start]
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._spans:
+            start, end = self._spans[0]
+            self._file.seek(start)
+            n = self._file.readinto(memoryview(buffer)[:end - start])
+            if n and start + n < end:
+                self._spans[0] = (start + n, end)
+            else:
+                self._spans.pop(0)
+            if n:
+                return n
+        return 0
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_range(filepath, header_end, start, end):
+    """
+    A binary file object over the header, bytes [0, header_end), followed by the rows in
+    bytes [start, end). Read a buffer at a time, the range is never held in memory at once.
+    """
+    return io.BufferedReader(_SpansReader(filepath, [(0, header_end), (start, end)]))
+
+
+def _count_block(block, in_quotes):
+    """Returns (record-ending newlines in block, whether block ends inside a quoted field)."""
+    import numpy as np
+
+    if b'"' not in block:
+        return (0 if in_quotes else block.count(b"\n")), in_quotes
+    data = np.frombuffer(block, dtype=np.uint8)
+    # Running quote count, mod 256 is enough for its parity.
+    quotes = np.cumsum(data == QUOTE, dtype=np.uint8)
+    quotes += np.uint8(in_quotes)
+    records = int(np.count_nonzero((data == NEWLINE) & ((quotes & 1) == 0)))
+    return records, int(quotes[-1] & 1)
+
+
+def count_records(filepath):
+    """
+    Counts the records in a csv, header included, without parsing fields. The file is
+    memory mapped and scanned a block at a time; newlines inside quoted fields are not counted.
+    Compressed (.gz, .zst) files are decompressed a block at a time instead.
+    """
+    from dbt_pipeline_utils.scripts.helpers.general import split_compression, open_file
+
+    records = 0
+    in_quotes = 0
+    last = b"\n"
+
+    if split_compression(filepath)[1]:
+        with open_file(filepath, "rb") as f:
+            while block := f.read(BLOCK_SIZE):
+                counted, in_quotes = _count_block(block, in_quotes)
+                records += counted
+                last = block[-1:]
+    else:
+        size = os.path.getsize(filepath)
+        if size == 0:
+            return 0
+        with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, size, BLOCK_SIZE):
+                counted, in_quotes = _count_block(mm[start:start + BLOCK_SIZE], in_quotes)
+                records += counted
+            last = mm[size - 1:size]
+
+    if last != b"\n":
+        # The last record has no trailing newline.
+        records += 1
+    return records
+
+
+def count_data_rows(filepath):
+    """Records after the header."""
+    return max(count_records(filepath) - 1, 0)
@@ -1,9 +1,10 @@
 import subprocess
-from jinja2 import Template
 import json
+import shlex
 from abc import ABC, abstractmethod
 from dbt_pipeline_utils.scripts.helpers.general import *
 from dbt_pipeline_utils.scripts.helpers.common import *
+from dbt_pipeline_utils.scripts.helpers.processor_registry import get_processor_class
 from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_common_docs import DocGeneration
 from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_ftd_docs import FTDDocGenClass
 from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_tgt_docs import TgtDocGenClass
@@ -12,6 +13,18 @@ from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_model_
 class DatabaseBC(ABC, DocGeneration, FTDDocGenClass, TgtDocGenClass, RunScriptClass):
     """Base class to define common methods for file processing."""
 
+    # table_info key holding the filename of the table's data dictionary/data file.
+    ddict_key = "identifier"
+
+    # What the backend can do, read through processor_registry.get_capabilities so
+    # the orchestrator can pick the fastest load path.
+    #  parallel_load: import_data can run for several tables at the same time.
+    #  bulk_copy: import_data uses the database's native bulk COPY.
+    #  indexes: generated models carry dbt indexes config and an ANALYZE post-hook.
+    #  fast_load: fast_load_data can replace import_data, see process_study --fast_load.
+    #  replace_load: replace_load_data can replace import_data, see process_study --replace_load.
+    capabilities = {"parallel_load": False, "bulk_copy": False, "indexes": False, "fast_load": False, "replace_load": False}
+
     def __init__(self, study_config, ftd_config, table_name, table_info, paths):
         self.study_config = study_config
         self.ftd_config = ftd_config
@@ -59,7 +72,7 @@ class DatabaseBC(ABC, DocGeneration, FTDDocGenClass, TgtDocGenClass, RunScriptCl
         The filename that is stored with column data. 
         '''
         datafile_info = self.data_files.get(table_id, {})
-        return Path(datafile_info.get("identifier")).stem
+        return data_file_stem(datafile_info.get("identifier"))
 
 
     def get_db_vars(self):
@@ -79,6 +92,8 @@ class DatabaseBC(ABC, DocGeneration, FTDDocGenClass, TgtDocGenClass, RunScriptCl
 
         Default postgress pipeline db
         """
+        from jinja2 import Template
+
         column_defs, src_table_id = self.extract_table_schema()
         logger.debug(f"Start pipeline db, src table creation {src_table_id}")
 
@@ -127,13 +142,25 @@ class DatabaseBC(ABC, DocGeneration, FTDDocGenClass, TgtDocGenClass, RunScriptCl
             logger.exception("❌ Unexpected error during import:")
         
 
+    def copy_source(self, csv_file):
+        """
+        The FROM of a psql \\COPY of csv_file. Compressed files are streamed through the
+        client's gzip/zstd into the COPY, so they are never decompressed on disk.
+        """
+        _, compression = split_compression(csv_file)
+        if compression is None:
+            return f"'{csv_file}'"
+        # The compressions are named after their command line tools.
+        command = f"{compression} -dc {shlex.quote(str(csv_file))}"
+        return "PROGRAM '" + command.replace("'", "''") + "'"
+
     def import_data(self):
 
         # Will error if not a one liner with semi colon
         csv_file = self.paths["src_data_dir"] / Path(f"{self.src_data_csv}")
 
         sql_query = f"""
-        \\COPY {self.src_schema}.{self.new_table_name} FROM '{csv_file}' DELIMITER ',' CSV HEADER;
+        \\COPY {self.src_schema}.{self.new_table_name} FROM {self.copy_source(csv_file)} DELIMITER ',' CSV HEADER;
         """
 
         try:
@@ -160,11 +187,174 @@ class DatabaseBC(ABC, DocGeneration, FTDDocGenClass, TgtDocGenClass, RunScriptCl
         except Exception as ex:
             logger.exception("❌ Unexpected error during import:")
 
+    def run_psql(self, sql_query):
+        """Runs a psql script, stopping at the first error. Raises subprocess.CalledProcessError."""
+        return subprocess.run(
+            ["psql", "-h", self.host, "-U", self.user, "-d", self.dbname, "-v", "ON_ERROR_STOP=1", "-q"],
+            input=sql_query,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def fast_load_data(self, unlogged=False):
+        """
+        Replaces the table's rows with the data file in one transaction:
+         - TRUNCATE and COPY share the transaction, so COPY can use FREEZE, writing the rows
+           already frozen (no later hint bit or vacuum freeze rewrites) and, with
+           wal_level=minimal, skipping WAL.
+         - unlogged: the table is set UNLOGGED, src tables can be rebuilt from the data files.
+           Unlogged tables are emptied after a crash and are not replicated.
+         - indexes that don't back a constraint are dropped before the COPY and rebuilt once after it.
+         - ANALYZE refreshes the planner statistics for the dbt models.
+        Raises subprocess.CalledProcessError if any statement fails, the transaction is rolled back.
+        """
+        csv_file = self.paths["src_data_dir"] / Path(f"{self.src_data_csv}")
+        table = f"{self.src_schema}.{self.new_table_name}"
+
+        sql_query = f"""
+        BEGIN;
+        CREATE TEMP TABLE deferred_indexes ON COMMIT DROP AS
+            SELECT i.indexrelid::regclass::text AS index_name, pg_get_indexdef(i.indexrelid) AS index_def
+            FROM pg_index i
+            WHERE i.indrelid = '{table}'::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid);
+        DO $$ DECLARE idx record; BEGIN
+            FOR idx IN SELECT index_name FROM deferred_indexes LOOP EXECUTE 'DROP INDEX ' || idx.index_name; END LOOP;
+        END $$;
+        TRUNCATE {table};
+        ALTER TABLE {table} SET {'UNLOGGED' if unlogged else 'LOGGED'};
+        \\COPY {table} FROM {self.copy_source(csv_file)} WITH (FORMAT csv, HEADER true, DELIMITER ',', FREEZE true);
+        DO $$ DECLARE idx record; BEGIN
+            FOR idx IN SELECT index_def FROM deferred_indexes LOOP EXECUTE idx.index_def; END LOOP;
+        END $$;
+        COMMIT;
+        ANALYZE {table};
+        """
+
+        try:
+            self.run_psql(sql_query)
+            logger.info(f"✅ Fast loaded {table}{' (unlogged)' if unlogged else ''}")
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"❌ Fast load of {table} failed, rolled back:\n%s", (e.stderr or "").strip())
+            raise
+
+    def replace_load_data(self, unlogged=False):
+        """
+        Loads the data file into a shadow table, checks its row count against the file and
+        swaps it in with a rename. Reruns replace the table's rows instead of appending them.
+         - the shadow table is created in the COPY's transaction, so COPY can use FREEZE.
+         - readers keep using the old table while the shadow is loaded, the swap holds an
+           ACCESS EXCLUSIVE lock only for the renames, in one transaction.
+         - unlogged: the shadow table, and so the new src table, is UNLOGGED.
+         - LIKE doesn't copy privileges or the owner. The old table's table-level grants and
+           owner are copied to the shadow in the swap's transaction, before the renames.
+           Column-level grants are not copied. Changing the owner needs membership in the
+           owner's role, without it the shadow keeps the loading user as owner, with a warning.
+        Raises ValueError if the row counts differ, subprocess.CalledProcessError if a
+        statement fails. The old table is left in place either way.
+        """
+        from dbt_pipeline_utils.scripts.helpers.csv_ranges import count_data_rows
+
+        csv_file = self.paths["src_data_dir"] / Path(f"{self.src_data_csv}")
+        table = f"{self.src_schema}.{self.new_table_name}"
+        shadow_name = f"{self.new_table_name}__shadow"
+        replaced_name = f"{self.new_table_name}__replaced"
+        shadow = f"{self.src_schema}.{shadow_name}"
+
+        load_query = f"""
+        BEGIN;
+        DROP TABLE IF EXISTS {shadow};
+        CREATE {'UNLOGGED ' if unlogged else ''}TABLE {shadow} (LIKE {table} INCLUDING ALL);
+        \\COPY {shadow} FROM {self.copy_source(csv_file)} WITH (FORMAT csv, HEADER true, DELIMITER ',', FREEZE true);
+        COMMIT;
+        ANALYZE {shadow};
+        """
+
+        # Grants and owner of the old table, e.g. read access of roles outside dbt.
+        copy_privileges = f"""
+        DO $$
+        DECLARE
+            g record;
+        BEGIN
+            FOR g IN
+                SELECT a.privilege_type, a.is_grantable, a.grantee, r.rolname
+                FROM pg_class c
+                CROSS JOIN LATERAL aclexplode(c.relacl) a
+                LEFT JOIN pg_roles r ON r.oid = a.grantee
+                WHERE c.oid = '{table}'::regclass
+            LOOP
+                EXECUTE format('GRANT %s ON {shadow} TO %s%s', g.privilege_type,
+                    CASE WHEN g.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(g.rolname) END,
+                    CASE WHEN g.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END);
+            END LOOP;
+            BEGIN
+                EXECUTE format('ALTER TABLE {shadow} OWNER TO %I',
+                    (SELECT pg_get_userbyid(relowner) FROM pg_class WHERE oid = '{table}'::regclass));
+            EXCEPTION WHEN insufficient_privilege THEN
+                RAISE WARNING 'Could not give {shadow} the owner of {table}: %', SQLERRM;
+            END;
+        END $$;
+        """
+
+        swap_query = f"""
+        BEGIN;
+        SET LOCAL lock_timeout = '60s';
+        {copy_privileges}
+        ALTER TABLE {table} RENAME TO {replaced_name};
+        ALTER TABLE {shadow} RENAME TO {self.new_table_name};
+        DROP TABLE {self.src_schema}.{replaced_name};
+        COMMIT;
+        """
+
+        try:
+            self.run_psql(load_query)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"❌ Loading {shadow} failed, {table} is unchanged:\n%s", (e.stderr or "").strip())
+            raise
+
+        file_rows = count_data_rows(csv_file)
+        loaded_rows = self.count_loaded_rows(shadow_name)
+        if loaded_rows != file_rows:
+            self.run_psql(f"DROP TABLE IF EXISTS {shadow};")
+            raise ValueError(f"{shadow} has {loaded_rows} rows, {csv_file} has {file_rows}. {table} is unchanged.")
+
+        try:
+            result = self.run_psql(swap_query)
+            if result.stderr:
+                logger.warning(result.stderr.strip())
+            logger.info(f"✅ Replaced {table} with {loaded_rows} rows{' (unlogged)' if unlogged else ''}")
+        except subprocess.CalledProcessError as e:
+            # e.g. views outside dbt depending on the old table, or the lock timed out.
+            logger.error(f"❌ Swapping {shadow} into {table} failed, {table} is unchanged:\n%s", (e.stderr or "").strip())
+            raise
+
+    def count_loaded_rows(self, table_name=None):
+        """Returns count(*) of the loaded src table, or another table of the src schema, or None when it can't be queried."""
+        table_name = table_name or self.new_table_name
+        sql_query = f'SELECT count(*) FROM {self.src_schema}.{table_name};'
+
+        try:
+            result = subprocess.run(
+                ["psql", "-h", self.host, "-U", self.user, "-d", self.dbname, "-At", "-c", sql_query],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            return int(result.stdout.strip())
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"❌ Could not count rows of {self.src_schema}.{table_name}:\n%s", (e.stderr or "").strip())
+        except ValueError:
+            logger.error(f"❌ Unexpected count(*) output for {self.src_schema}.{table_name}: {result.stdout!r}")
+        return None
+
     def extract_table_schema(self):
         """Extracts column definitions from the data dictionary CSV."""
 
         full_file_path = self.paths['src_data_dir']  / Path(f'{self.src_data_csv}')
-        dd = read_file(full_file_path)
+        dd = read_file(full_file_path, dtype=str)
         # Use extract_columns to get structured column data
         column_data_list = self.extract_columns(dd, self.table_info['format'])
 
@@ -178,19 +368,15 @@ class DatabaseBC(ABC, DocGeneration, FTDDocGenClass, TgtDocGenClass, RunScriptCl
 
     def get_src_ddict_path(self, table_info):
         src_dd_path = self.paths['src_data_dir']
-        
-        if table_info.get("import_type") == 'synapse':
-            ddict = table_info.get("src_file_id")
 
-        if table_info.get("import_type") == 'pg':
-            ddict = table_info.get("identifier")
+        try:
+            processor_class = get_processor_class(table_info.get("import_type"))
+        except ValueError:
+            logger.error(f"{table_info.get('import_type')} is not valid")
+            raise
 
-        if table_info.get("import_type") == 'duckdb':
-            ddict = table_info.get("identifier")
+        ddict = table_info.get(processor_class.ddict_key)
 
-        if table_info.get("import_type") not in ['pg', 'duckdb', 'synapse']:
-            logger.error(f"{table_info.get('import_type')} is not valid")
-            
         return src_dd_path / Path(f"{ddict}"), ddict
     
     def get_join_conditions(self, current_table):
@@ -5,6 +5,10 @@ import subprocess
 import json
 
 class DuckDBFileProcessor(DatabaseBC):
+    # A duckdb file allows a single writer, and csvs are registered as external sources.
+    # Its zonemaps make b-tree indexes of little use for these scans, so models skip them.
+    capabilities = {"parallel_load": False, "bulk_copy": False, "indexes": False, "fast_load": False, "replace_load": False}
+
     def __init__(self, study_config, ftd_config, table_name, table_info, paths):
         super().__init__(study_config, ftd_config, table_name, table_info, paths)
 
@@ -19,7 +23,8 @@ class DuckDBFileProcessor(DatabaseBC):
         This function will run using an import macro within the dbt projcet itself.
         """
         csv_path = f"{self.paths['src_data_dir']}/{self.src_data_csv}"
-        tablename = Path(self.src_data_csv).stem
+        # duckdb reads .gz and .zst csvs directly.
+        tablename = data_file_stem(self.src_data_csv)
         fully_qualified_tablename = f"{tablename}"
 
         args = f'{{fq_tablename: "{fully_qualified_tablename}", csv_path: "{csv_path}"}}'
@@ -52,6 +57,21 @@ class DuckDBFileProcessor(DatabaseBC):
         except Exception as ex:
             logger.exception("❌ Unexpected error during Duckdb import:")
 
+    def count_loaded_rows(self, table_name=None):
+        """
+        The src table is an external source over the csv, so count the rows DuckDB's csv
+        reader sees in it, with the same reader dbt uses.
+        """
+        import duckdb
+
+        csv_path = f"{self.paths['src_data_dir']}/{self.src_data_csv}"
+        try:
+            with duckdb.connect() as conn:
+                return conn.execute("SELECT count(*) FROM read_csv_auto(?, header=true)", [csv_path]).fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ DuckDB could not count rows of {csv_path}: {e}")
+            return None
+
     def generate_new_table(self):
         pass
 
@@ -2,6 +2,8 @@ from dbt_pipeline_utils.scripts.helpers.data_processors import DatabaseBC
 from pathlib import Path
 
 class PostgresFileProcessor(DatabaseBC):
+    capabilities = {"parallel_load": True, "bulk_copy": True, "indexes": True, "fast_load": True, "replace_load": True}
+
     def __init__(self, study_config, ftd_config, table_name, table_info, paths):
         super().__init__(study_config, ftd_config, table_name, table_info, paths)
 
@@ -4,6 +4,10 @@ from dbt_pipeline_utils.scripts.helpers.general import *
 import synapseclient
 
 class SynapseFileProcessor(DatabaseBC):
+    # Files are downloaded locally, then loaded into the postgres pipeline db with \COPY.
+    ddict_key = "src_file_id"
+    capabilities = {"parallel_load": True, "bulk_copy": True, "indexes": True, "fast_load": True, "replace_load": True}
+
     def __init__(self, study_config, ftd_config, table_name, table_info, paths):
         super().__init__(study_config, ftd_config, table_name, table_info, paths)
 
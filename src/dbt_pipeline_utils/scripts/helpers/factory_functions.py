@@ -1,8 +1,5 @@
-from dbt_pipeline_utils.scripts.helpers.databases.postgres import PostgresFileProcessor
-from dbt_pipeline_utils.scripts.helpers.databases.sql_server import SynapseFileProcessor
-from dbt_pipeline_utils.scripts.helpers.databases.duckdb import DuckDBFileProcessor
-
 from dbt_pipeline_utils.scripts.helpers.general import *
+from dbt_pipeline_utils.scripts.helpers.processor_registry import get_processor_class
 
 def file_setup(study_config, ftd_config, table_name, table_info, paths):
     """file_type is not necessary when processing dds"""
@@ -20,15 +17,13 @@ def file_setup(study_config, ftd_config, table_name, table_info, paths):
 def get_data_processor(study_config, ftd_config, table_name, table_info, paths):
     """
     Factory function to return the correct data processor class.
+
+    The class is looked up in the processor registry, which imports the backend
+    module only the first time that import_type is requested.
     """
 
     import_type = table_info.get("import_type")
 
-    if import_type == "synapse":
-        return SynapseFileProcessor(study_config, ftd_config, table_name, table_info, paths), import_type
-    if import_type == "pg":
-        return PostgresFileProcessor(study_config, ftd_config, table_name, table_info, paths), import_type
-    if import_type == "duckdb":
-        return DuckDBFileProcessor(study_config, ftd_config, table_name, table_info, paths), import_type
-    if import_type not in ["pg", 'synapse', 'duckdb']:
-        raise ValueError(f"Unsupported file import type: {import_type}")
+    processor_class = get_processor_class(import_type)
+
+    return processor_class(study_config, ftd_config, table_name, table_info, paths), import_type
@@ -1,31 +1,194 @@
 import os
-import yaml
 import re
-import pandas as pd
 import dbt_pipeline_utils
 from pathlib import Path
 from dbt_pipeline_utils.scripts.helpers.common import *
 
 from dbt_pipeline_utils import logger
 
+# yaml and pandas are imported inside the readers/writers below, so entry points
+# only pay for them once a file of that type is actually touched.
+
+# Compressed files are decompressed while they are read, never to disk.
+# zstd needs the zstandard package.
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def split_compression(filepath):
+    """Returns (file extension, compression or None), e.g. a.csv.gz -> (".csv", "gzip")."""
+    suffixes = [suffix.lower() for suffix in Path(filepath).suffixes]
+    compression = COMPRESSIONS.get(suffixes[-1]) if suffixes else None
+    if compression:
+        suffixes = suffixes[:-1]
+    return (suffixes[-1] if suffixes else ""), compression
+
+
+def data_file_stem(filepath):
+    """The file name without its extension and compression extension, e.g. a.csv.gz -> a."""
+    path = Path(filepath)
+    if split_compression(path)[1]:
+        path = Path(path.stem)
+    return path.stem
+
+
+def open_file(filepath, mode="r", **kwargs):
+    """
+    Opens a file for reading, decompressing .gz and .zst files on the fly.
+    kwargs (encoding, newline, ...) are passed on in text mode.
+    """
+    _, compression = split_compression(filepath)
+    binary = "b" in mode
+
+    if compression == "gzip":
+        import gzip
+        return gzip.open(filepath, "rb" if binary else "rt", **kwargs)
+    if compression == "zstd":
+        import zstandard
+        return zstandard.open(filepath, "rb" if binary else "rt", **kwargs)
+    return open(filepath, mode, **kwargs)
+
+
+# Parsers read_file uses when no engine is passed.
+#  CSV_ENGINE: pandas read_csv engine, "c", "pyarrow" (needs pyarrow) or "python". None is pandas' default, "c".
+#  YAML_ENGINE: "libyaml", the C CSafeLoader when PyYAML was built with it, or "python", the pure python SafeLoader.
+CSV_ENGINE = None
+YAML_ENGINE = "libyaml"
+
+# read_file formats read into DataFrames, they support partial reads.
+TABLE_FORMATS = (".csv", ".tsv", ".xlsx", ".parquet", ".feather")
+
+
+def _read_yaml(filepath, engine=None):
+    import yaml
+    engine = engine or YAML_ENGINE
+    # Same results as yaml.safe_load, CSafeLoader only parses faster.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader) if engine == "libyaml" else yaml.SafeLoader
+    with open_file(filepath, "r") as f:
+        return yaml.load(f, Loader=loader)
+
+
+def _read_text(filepath):
+    with open_file(filepath, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _limit_chunks(chunks, nrows=None):
+    """Yields the DataFrame chunks until nrows rows, the last one cut short."""
+    remaining = nrows
+    for chunk in chunks:
+        if remaining is not None:
+            if remaining <= 0:
+                return
+            chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+        yield chunk
+
+
+def _chunked(df, chunksize):
+    return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+
+def _read_csv(filepath, engine=None, dtype=None, sep=",", columns=None, nrows=None, header_only=False, chunksize=None):
+    import pandas as pd
+    engine = engine or CSV_ENGINE
+    if engine == "pyarrow" and (nrows is not None or header_only or chunksize):
+        # pyarrow parses whole files, the c parser stops after nrows.
+        engine = "c"
+    # pandas infers gzip/zstd from the extension.
+    return pd.read_csv(filepath, header=0, sep=sep, engine=engine, dtype=dtype, usecols=columns,
+                       nrows=0 if header_only else nrows, chunksize=chunksize)
+
+
+def _read_excel(filepath, dtype=None, columns=None, nrows=None, header_only=False, chunksize=None):
+    import pandas as pd
+    df = pd.read_excel(filepath, header=0, dtype=dtype, usecols=columns, nrows=0 if header_only else nrows)
+    return _chunked(df, chunksize) if chunksize else df
+
+
+def _read_parquet(filepath, columns=None, nrows=None, header_only=False, chunksize=None):
+    import pandas as pd
+    if nrows is None and not header_only and not chunksize:
+        return pd.read_parquet(filepath, columns=columns)
+
+    # Only the footer, or the row groups up to nrows, are read.
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(filepath)
+    schema = parquet_file.schema_arrow
+    empty = schema.empty_table().select(columns or schema.names).to_pandas()
+    if header_only:
+        return empty
+
+    batches = parquet_file.iter_batches(batch_size=chunksize or 65_536, columns=columns)
+    chunks = _limit_chunks((batch.to_pandas() for batch in batches), nrows)
+    if chunksize:
+        return chunks
+    frames = list(chunks)
+    return pd.concat(frames, ignore_index=True) if frames else empty
+
+
+def _read_feather(filepath, columns=None, nrows=None, header_only=False, chunksize=None):
+    # Memory mapped: for uncompressed files, the columns and rows that are not selected are
+    # never read. Compressed files (lz4, pandas' default, or zstd) have the selected columns
+    # decompressed in full before nrows or chunksize applies.
+    from pyarrow import feather
+    table = feather.read_table(filepath, columns=columns, memory_map=True)
+    if header_only:
+        return table.schema.empty_table().to_pandas()
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    if chunksize:
+        return (table.slice(start, chunksize).to_pandas() for start in range(0, table.num_rows, chunksize))
+    return table.to_pandas()
+
+
+def _write_yaml(filename, data):
+    import yaml
+    with open(filename, "w", encoding="utf-8") as f:
+        yaml.dump(data, f, default_flow_style=False, sort_keys=False, indent=2)
+
+
+def read_file(filepath, engine=None, dtype=None, columns=None, nrows=None, header_only=False, chunksize=None):
+    """
+    engine: the csv/tsv or yaml parser, see CSV_ENGINE and YAML_ENGINE.
+    dtype: passed to the csv, tsv and xlsx readers. dtype=str skips type inference, every cell
+      is read as written and empty cells as NaN. Parquet and feather keep their stored types.
+
+    Partial reads, for the table formats (csv, tsv, xlsx, parquet, feather):
+     - columns: list of the columns to read.
+     - nrows: read at most nrows data rows.
+     - header_only: an empty DataFrame with the file's columns.
+     - chunksize: an iterator of DataFrames of chunksize rows instead of one DataFrame.
+
+    Returns None for a missing file, except for partial reads, which raise FileNotFoundError:
+    their callers iterate or index the result.
+    """
+    part = {"columns": columns, "nrows": nrows, "header_only": header_only, "chunksize": chunksize}
 
-def read_file(filepath):
     if not os.path.exists(filepath):
+        if any(part.values()):
+            raise FileNotFoundError(f"File does not exist: {filepath}")
         logger.warning(f"File does not exist: {filepath}")
         return
     
     file_handlers = {
-        ".yaml": lambda: yaml.safe_load(open(filepath, "r")),
-        ".yml": lambda: yaml.safe_load(open(filepath, "r")),
-        ".csv": lambda: pd.read_csv(filepath, header=0),
-        ".xlsx": lambda: pd.read_excel(filepath, header=0),
-        ".sql": Path(filepath).read_text
+        ".yaml": lambda: _read_yaml(filepath, engine),
+        ".yml": lambda: _read_yaml(filepath, engine),
+        ".csv": lambda: _read_csv(filepath, engine, dtype, **part),
+        ".tsv": lambda: _read_csv(filepath, engine, dtype, sep="\t", **part),
+        ".xlsx": lambda: _read_excel(filepath, dtype, **part),
+        ".parquet": lambda: _read_parquet(filepath, **part),
+        ".feather": lambda: _read_feather(filepath, **part),
+        ".sql": lambda: _read_text(filepath)
     }
 
-    file_ext = os.path.splitext(filepath)[-1].lower()
+    file_ext, compression = split_compression(filepath)
 
     if file_ext not in file_handlers:
         raise ValueError(f"Unsupported file type: {file_ext}")
+    if compression and file_ext in (".xlsx", ".parquet", ".feather"):
+        raise ValueError(f"Unsupported file type: compressed {file_ext}")
+    if file_ext not in TABLE_FORMATS and any(part.values()):
+        raise ValueError(f"Partial reads are not supported for {file_ext} files")
 
     logger.debug(f"Reading {file_ext} from file: {filepath}")
     data = file_handlers[file_ext]()
@@ -51,8 +214,8 @@ def write_file(filename, data, overwrite=False):
             return
 
     file_handlers = {
-        ".yaml": lambda: yaml.dump(data, open(filename, "w", encoding="utf-8"), default_flow_style=False, sort_keys=False, indent=2),
-        ".yml": lambda: yaml.dump(data, open(filename, "w", encoding="utf-8"), default_flow_style=False, sort_keys=False, indent=2),
+        ".yaml": lambda: _write_yaml(filename, data),
+        ".yml": lambda: _write_yaml(filename, data),
         ".csv": lambda: data.to_csv(filename, index=False),
         ".sql": lambda: open(filename, "w", encoding="utf-8").write(data),
         ".md": lambda: open(filename, "w", encoding="utf-8").write(data),
@@ -216,3 +379,6 @@ def generate_doc_block_name(table_name, column_name):
     name = f'{table_name}_{column_name}'
     return re.sub(r'[^a-zA-Z0-9_]', '_', name)
 
+def format_variable_name(variable_name):
+    """The formatted_variable_name used for stg columns: lowercase, spaces, commas and dashes to underscores."""
+    return str(variable_name).lower().replace(" ", "_").replace(",", "_").replace("-", "_")
@@ -0,0 +1,100 @@
+'''
+Plans the stg table joins of a generated ftd model.
+
+ - a reverse index maps each stg column to the tables that have it, so a column's table
+   is a dict lookup. Columns found in several tables are reported as ambiguous, the first
+   table in data_dictionary order is used, as before.
+ - only the tables the model's columns come from are joined, plus any table needed to
+   connect them through join_cols.
+ - the largest table is the base of the select, the others are joined smallest first.
+   Sizes are row counts when every table has a column profile, else data file sizes.
+ - a table with no join_cols path to the others fails the generation, rather than a cross join.
+'''
+
+from collections import deque
+from dbt_pipeline_utils import logger
+
+
+class JoinPlanner():
+    def __init__(self, table_columns, data_files, table_sizes=None):
+        """
+        table_columns: {table_id: set of stg column names}, in data_dictionary order.
+        data_files: the study config's data_files, for join_cols.
+        table_sizes: optional {table_id: rows or bytes}, used to order the joins.
+        """
+        self.tables = list(table_columns)
+        self.table_sizes = table_sizes or {}
+
+        self.column_tables = {}
+        for table_id, columns in table_columns.items():
+            for col in columns:
+                self.column_tables.setdefault(col, []).append(table_id)
+
+        # (table, other) -> condition. join_cols must be declared on both tables, as get_join_conditions expects.
+        self.edges = {}
+        for table_id in self.tables:
+            for other, left_column in ((data_files.get(table_id) or {}).get("join_cols") or {}).items():
+                right_column = ((data_files.get(other) or {}).get("join_cols") or {}).get(table_id)
+                if right_column and other in table_columns:
+                    self.edges[(table_id, other)] = f"{other}.{right_column} = {table_id}.{left_column}"
+
+    def resolve(self, column, model=""):
+        """Returns the table a column comes from, or None."""
+        tables = self.column_tables.get(column)
+        if not tables:
+            return None
+        if len(tables) > 1:
+            logger.warning(f"{model}: {column} is in several stg tables {tables}, using {tables[0]}")
+        return tables[0]
+
+    def _neighbours(self, table_id):
+        return [other for (table, other) in self.edges if table == table_id]
+
+    def _path(self, start, targets):
+        """Tables between start and the nearest table in targets on a join_cols path, excluding both ends."""
+        seen = {start}
+        queue = deque([[start]])
+        while queue:
+            path = queue.popleft()
+            for other in self._neighbours(path[-1]):
+                if other in seen:
+                    continue
+                if other in targets:
+                    return path[1:]
+                seen.add(other)
+                queue.append(path + [other])
+        return None
+
+    def _size(self, table_id):
+        return self.table_sizes.get(table_id, 0)
+
+    def plan(self, needed, model=""):
+        """
+        needed: tables the model's columns come from.
+        Returns (base_table, [(table, join condition)]). Raises ValueError when a table has
+        no join_cols path to the ones already joined.
+        """
+        needed = [table for table in self.tables if table in set(needed)]
+        if not needed:
+            # Nothing maps to a stg column, keep a base table so the model still selects rows.
+            return self.tables[0], []
+
+        base = max(needed, key=lambda table: (self._size(table), -self.tables.index(table)))
+        joined = [base]
+        joins = []
+
+        for table in sorted((t for t in needed if t != base), key=self._size):
+            if table in joined:
+                continue
+            path = self._path(table, set(joined))
+            if path is None:
+                raise ValueError(f"{model}: no join_cols path from {table} to {joined}, add join_cols to the study config")
+            # Bridging tables are joined first, from the joined side outwards.
+            for step in reversed([table] + path):
+                if step in joined:
+                    continue
+                conditions = [self.edges[(step, other)] for other in joined if (step, other) in self.edges]
+                joins.append((step, " and ".join(conditions)))
+                joined.append(step)
+
+        return base, joins
@@ -0,0 +1,206 @@
+'''
+Local, offline index of ontology terms, built once from downloaded ontology dumps
+(OBO files such as hp.obo and mondo.obo, or CSV exports such as ICD10CM and LOINC).
+
+Terms are stored in SQLite. Exact CURIE lookups use the primary key, code prefix searches
+a range scan over it, and label searches an FTS5 full text index. Results use the same
+shape as search_dragon's run_search, so code_api_search can use them in place of an API
+response. See scripts/build_ontology_index.py to build an index.
+'''
+
+import csv
+import sqlite3
+from pathlib import Path
+from dbt_pipeline_utils import logger
+from dbt_pipeline_utils.scripts.helpers.prefix_index import load_prefix_index
+
+OBO_PURL = "http://purl.obolibrary.org/obo/"
+
+# SQLite limits the number of ? parameters in one statement.
+LOOKUP_BATCH = 500
+
+
+def parse_obo(filepath):
+    """Streams (code, label, description) for each non obsolete [Term] in an OBO file."""
+    term = None
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("["):
+                if term and term.get("id") and not term.get("is_obsolete"):
+                    yield term["id"], term.get("name"), term.get("def")
+                term = {} if line == "[Term]" else None
+                continue
+            if term is None or ": " not in line:
+                continue
+            key, value = line.split(": ", 1)
+            if key == "def":
+                # def: "text" [refs]
+                value = value.split('" [', 1)[0].strip('"')
+            if key in ("id", "name", "def"):
+                term.setdefault(key, value)
+            elif key == "is_obsolete" and value.strip() == "true":
+                term["is_obsolete"] = True
+
+    if term and term.get("id") and not term.get("is_obsolete"):
+        yield term["id"], term.get("name"), term.get("def")
+
+
+def parse_csv(filepath, code_column, label_column, prefix=None, description_column=None, delimiter=","):
+    """Streams (code, label, description) from a csv export. prefix is added to codes without one."""
+    with open(filepath, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter=delimiter):
+            code = (row.get(code_column) or "").strip()
+            if not code:
+                continue
+            if prefix and not code.startswith(f"{prefix}:"):
+                code = f"{prefix}:{code}"
+            description = row.get(description_column) if description_column else None
+            yield code, row.get(label_column), description
+
+
+def code_iri(code):
+    prefix, _, local_id = code.partition(":")
+    return f"{OBO_PURL}{prefix}_{local_id}"
+
+
+class OntologyIndex():
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS terms (
+                code TEXT PRIMARY KEY,
+                prefix TEXT NOT NULL,
+                label TEXT,
+                description TEXT,
+                system TEXT,
+                code_iri TEXT
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS labels (
+                code TEXT PRIMARY KEY,
+                label TEXT
+            );
+        """)
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS labels_fts USING fts5(label, content='labels', content_rowid='rowid')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite was built without FTS5, label searches fall back to LIKE.")
+            self.fts = False
+
+    def add_terms(self, terms, obo_iri=True, batch_size=50_000):
+        """
+        terms: iterable of (code, label, description). Returns the number of terms added.
+        obo_iri: set code_iri to the OBO purl of the code, only meaningful for OBO ontologies.
+        """
+        systems = load_prefix_index().systems
+        count = 0
+        batch = []
+
+        def flush():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO terms (code, prefix, label, description, system, code_iri) VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO labels (code, label) VALUES (?, ?)",
+                [(row[0], row[2]) for row in batch],
+            )
+            batch.clear()
+
+        with self.conn:
+            for code, label, description in terms:
+                prefix = code.partition(":")[0]
+                batch.append((code, prefix, label, description, systems.get(prefix), code_iri(code) if obo_iri else None))
+                count += 1
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        return count
+
+    def rebuild_label_index(self):
+        if self.fts:
+            with self.conn:
+                self.conn.execute("INSERT INTO labels_fts(labels_fts) VALUES ('rebuild')")
+        self.conn.execute("ANALYZE")
+
+    @staticmethod
+    def _result(row):
+        code, label, description, system, iri = row
+        return {
+            "code": code,
+            "display": label,
+            "description": description,
+            "system": system,
+            "code_iri": iri,
+            "ontology_prefix": code.partition(":")[0],
+        }
+
+    def lookup_many(self, codes):
+        """Exact CURIE lookups. Returns {code: result} for the codes that are in the index."""
+        codes = list(dict.fromkeys(codes))
+        found = {}
+        for i in range(0, len(codes), LOOKUP_BATCH):
+            batch = codes[i:i + LOOKUP_BATCH]
+            rows = self.conn.execute(
+                f"SELECT code, label, description, system, code_iri FROM terms WHERE code IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for row in rows:
+                found[row[0]] = {"results": [self._result(row)]}
+        return found
+
+    def search_code_prefix(self, code_prefix, limit=10):
+        """Codes starting with code_prefix, e.g. 'HP:00012'."""
+        rows = self.conn.execute(
+            "SELECT code, label, description, system, code_iri FROM terms WHERE code >= ? AND code < ? ORDER BY code LIMIT ?",
+            (code_prefix, code_prefix + "￿", limit),
+        )
+        return {"results": [self._result(row) for row in rows]}
+
+    def search_labels(self, text, limit=10):
+        """Terms whose label has a word starting with each word of text, best matches first."""
+        words = [w.replace('"', '') for w in text.split() if w.replace('"', '')]
+        if not words:
+            return {"results": []}
+
+        if self.fts:
+            query = " ".join(f'"{w}"*' for w in words)
+            rows = self.conn.execute(
+                """SELECT t.code, t.label, t.description, t.system, t.code_iri
+                   FROM labels_fts f JOIN labels l ON l.rowid = f.rowid JOIN terms t ON t.code = l.code
+                   WHERE labels_fts MATCH ? ORDER BY rank LIMIT ?""",
+                (query, limit),
+            )
+        else:
+            where = " AND ".join("label LIKE ?" for _ in words)
+            rows = self.conn.execute(
+                f"SELECT code, label, description, system, code_iri FROM terms WHERE {where} LIMIT ?",
+                [f"%{w}%" for w in words] + [limit],
+            )
+        return {"results": [self._result(row) for row in rows]}
+
+    def resolve_many(self, keywords, limit=1):
+        """
+        Answers what it can locally. CURIEs are looked up exactly (after alias normalization),
+        other keywords are label searches. Returns {keyword: result}, misses are left out.
+        """
+        index = load_prefix_index()
+        keywords = list(dict.fromkeys(keywords))
+        curies = [k for k in keywords if ":" in k]
+        normalized = dict(zip(curies, index.normalize(curies)))
+
+        found = self.lookup_many(normalized.values())
+        resolved = {k: found[n] for k, n in normalized.items() if n in found}
+
+        for keyword in keywords:
+            if ":" not in keyword:
+                result = self.search_labels(keyword, limit)
+                if result["results"]:
+                    resolved[keyword] = result
+        return resolved
+
+    def close(self):
+        self.conn.close()
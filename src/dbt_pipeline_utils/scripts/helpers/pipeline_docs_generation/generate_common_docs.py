@@ -1,7 +1,35 @@
 from dbt_pipeline_utils.scripts.helpers.common import *
 from dbt_pipeline_utils.scripts.helpers.general import *
 from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.model_tests import format_tests
+from dbt_pipeline_utils.scripts.helpers import column_profiler
+from dbt_pipeline_utils.scripts.helpers.processor_registry import data_file_path
 import re
+import pandas as pd
+
+def row_hash_sql(relation, columns):
+    """
+    A stable md5 of the columns' text, nulls distinct from empty strings. Identical rows are
+    numbered, so the n-th copy of a row always gets the same hash and a new copy a new one.
+    """
+    parts = [f"coalesce(cast({relation}.\"{col}\" as text), '__null__')" for col in columns] or ["''"]
+    content = f"md5(concat_ws('|', {', '.join(parts)}))"
+    return f"md5({content} || '|' || row_number() over (partition by {content}))"
+
+
+def model_config(**config):
+    """The {{ config(...) }} line of a generated model."""
+    return f"{{{{ config({', '.join(f'{k}={v!r}' for k, v in config.items())}) }}}}"
+
+
+def incremental_filter(relation, row_hash_column):
+    """On incremental runs, only rows whose hash is not already in the model."""
+    return f"""{{% if is_incremental() %}}
+where not exists (
+    select 1 from {{{{ this }}}} as existing
+    where existing.{row_hash_column} = {relation}.{row_hash_column}
+)
+{{% endif %}}"""
+
 
 class DocGeneration():
     """Base class for defining pipeline stages."""
@@ -18,9 +46,7 @@ class DocGeneration():
             try:
                 # variable_name (required — if NaN, fallback to 'unknown')
                 variable_name = row.get(column_map["variable_name"]) or None
-                formatted_variable_name = (
-                        str(variable_name).lower().replace(" ", "_").replace(",", "_").replace("-", "_")
-                    ) or None
+                formatted_variable_name = format_variable_name(variable_name) or None
 
                 description = row.get(column_map["description"]) or None
 
@@ -62,7 +88,8 @@ class DocGeneration():
             ddict_full_path, ddict = self.get_src_ddict_path(table_info)
 
             dd_format = table_info.get("format")
-            src_df = read_file(ddict_full_path)
+            # Dictionaries are text, dtype=str skips type inference.
+            src_df = read_file(ddict_full_path, dtype=str)
 
             column_data[src_table_key] = self.extract_columns(src_df, dd_format)
 
@@ -70,7 +97,7 @@ class DocGeneration():
 
                 stg_ddict = table_info.get("stg_src_table_id")
                 stg_ddict_full_path = src_dd_path / stg_ddict
-                stg_df = read_file(stg_ddict_full_path)
+                stg_df = read_file(stg_ddict_full_path, dtype=str)
 
                 dd_format = table_info.get("format")
 
@@ -175,7 +202,7 @@ class DocGeneration():
         source_tables = []
 
         for table_id, table_info in self.data_files.items():
-            src_filename = Path(table_info['identifier']).stem
+            src_filename = data_file_stem(table_info['identifier'])
             columns_metadata = [
                 {
                     "name": col_name,
@@ -316,14 +343,44 @@ select * from {self.src_schema}.{table_id}
             filepath = output_dir / Path(table_id) / f"{new_table}.sql"
 
             column_definitions = []
+            column_names = []
             id_list = []
             for col_name, column_name_code, _, col_data_type, _, _, _, _  in column_data.get(src_table, []):
                 if column_name_code.endswith("_id"):
                     id_list.append(column_name_code) 
                 sql_type = type_mapping.get(col_data_type, "text")
                 column_definitions.append(f'"{col_name}"::{sql_type} as "{column_name_code}"')
+                column_names.append(column_name_code)
+
+            # Columns the ftd models join this table on.
+            join_cols = list((self.data_files.get(table_id) or {}).get("join_cols", {}).values())
+
+            if self.get_materialization(table_info) == "incremental":
+                unique_key = self.get_unique_key(table_id, table_info.get("unique_key"), id_list, "ftd_index")
+                indexes = self.index_config(["ftd_index", *id_list, *join_cols])
+                sql_content = f"""{self.incremental_config(unique_key, **indexes)}
+
+with source as (
+    select 
+      {",\n       ".join(column_definitions)}
+    from {{{{ source('{self.study_id}','{src_table}') }}}}
+),
+
+hashed as (
+    select
+      {row_hash_sql("source", column_names)} AS ftd_index,
+      source.*
+    from source
+)
+
+select hashed.*
+from hashed
+{incremental_filter("hashed", "ftd_index")}
+"""
+                write_file(filepath, sql_content)
+                continue
 
-            sql_content = f"""{{{{ config(materialized='table') }}}}
+            sql_content = f"""{model_config(materialized='table', **self.index_config([*id_list, *join_cols]))}
 
 with source as (
     select 
@@ -340,9 +397,100 @@ from source
             # Write SQL file to the correct directory
             write_file(filepath, sql_content)
 
-    def generate_stg_dds(self):
+    def get_materialization(self, table_info=None):
+        """'table' or 'incremental', from the table's `materialized` key, else the study's."""
+        materialized = (table_info or {}).get("materialized") or self.study_config.get("materialized", "table")
+        if materialized not in ("table", "incremental"):
+            logger.warning(f"Unsupported materialized: {materialized}, using table")
+            materialized = "table"
+        return materialized
+
+    def get_unique_key(self, table_id, configured, id_columns, row_hash_column):
+        """
+        The incremental unique key: the configured column(s), else the row hash. _id columns
+        are not used on their own, as they are often repeated, e.g. participant_id in a
+        condition table, and a merge on them would drop rows.
+        """
+        if configured:
+            unique_key = [configured] if isinstance(configured, str) else list(configured)
+            unknown = [col for col in unique_key if col not in id_columns and col != row_hash_column]
+            if unknown:
+                logger.warning(f"{table_id} unique_key {unknown} are not _id columns of its dictionary")
+            return unique_key
+
+        if id_columns:
+            logger.debug(f"{table_id}: incremental on the row hash. Set unique_key to one of {id_columns} to merge updated rows.")
+        return [row_hash_column]
+
+    def incremental_config(self, unique_key, **extra):
+        config = {
+            "materialized": "incremental",
+            "unique_key": unique_key if len(unique_key) > 1 else unique_key[0],
+            "on_schema_change": "append_new_columns",
+            **extra,
+        }
+        return model_config(**config)
+
+    def index_config(self, columns):
+        """
+        dbt indexes config for the columns, and an ANALYZE post-hook so the planner has
+        statistics for the joins. Empty for backends without the indexes capability.
+        """
+        columns = list(dict.fromkeys(col for col in columns if col))
+        if not getattr(self, "capabilities", {}).get("indexes") or not columns:
+            return {}
+        return {
+            "indexes": [{"columns": [col]} for col in columns],
+            "post_hook": "analyze {{ this }}",
+        }
+
+    def profile_data_files(self, workers=None, chunksize=column_profiler.DEFAULT_CHUNKSIZE):
+        """Profiles each table's local data file in parallel. Returns {table_id: {column: summary}}."""
+        filepaths = {}
+        for table_id, table_info in self.data_files.items():
+            # Synapse tables are downloaded to their src_file_id, not their identifier.
+            import_type = (self.data_dictionary.get(table_id) or {}).get("import_type")
+            filepath = data_file_path(self.paths["src_data_dir"], table_info, import_type)
+            if split_compression(filepath)[0] in TABLE_FORMATS and filepath.exists():
+                filepaths[table_id] = filepath
+            else:
+                logger.debug(f"Not profiling {table_id}, no local data file at {filepath}")
+
+        return column_profiler.profile_files(filepaths, workers=workers, chunksize=chunksize)
+
+    def apply_profile(self, stg_df, profile):
+        """
+        Fills empty min, max and enumerations cells from the column profile, and adds the
+        null_count and approx_distinct columns. Columns are matched on src_variable_name.
+        """
+        pipeline_format_map = DD_FORMATS["pipeline_format"]
+        src_names = stg_df[pipeline_format_map["src_variable_name"]]
+
+        fills = {
+            pipeline_format_map["min"]: lambda summary: summary["min"],
+            pipeline_format_map["max"]: lambda summary: summary["max"],
+            pipeline_format_map["enumerations"]: column_profiler.enumerations,
+        }
+        for column, value in fills.items():
+            current = stg_df[column] if column in stg_df.columns else [None] * len(stg_df)
+            # object dtype, so integer mins don't turn into floats next to empty cells.
+            stg_df[column] = pd.Series(
+                [
+                    cell if pd.notna(cell) or name not in profile else value(profile[name])
+                    for cell, name in zip(current, src_names)
+                ],
+                index=stg_df.index,
+                dtype=object,
+            )
+
+        stg_df["null_count"] = src_names.map(lambda name: profile[name]["nulls"] if name in profile else None)
+        stg_df["approx_distinct"] = src_names.map(lambda name: profile[name]["approx_distinct"] if name in profile else None)
+        return stg_df
+
+    def generate_stg_dds(self, profiles=None):
         """Generates staging SQL files dynamically for each table based on the data dictionary.
-        open the src dd and apply minimal transformations"""
+        open the src dd and apply minimal transformations
+        profiles: optional, see profile_data_files. Fills min/max/enumerations the src dd leaves empty."""
 
         for table_id, table_info in self.data_dictionary.items():
             src_table_key = self.get_src_table_key(table_id)
@@ -353,7 +501,7 @@ from source
 
             ddict_full_path, ddict = self.get_src_ddict_path(table_info)
 
-            stg_df = read_file(ddict_full_path)
+            stg_df = read_file(ddict_full_path, dtype=str)
 
             column_data = self.load_src_column_data(src_only=True)
 
@@ -382,6 +530,9 @@ from source
             rename_map = {original_format_map[key]: pipeline_format_map[key] for key in pipeline_format_map if key in original_format_map}
             stg_df.rename(columns=rename_map, inplace=True)
 
+            if profiles and table_id in profiles:
+                stg_df = self.apply_profile(stg_df, profiles[table_id])
+
             t_path = src_dd_path / Path(f"ftd_transformations/{table_id}_stg_additions_dd.csv")
             if t_path.exists():  
                 transformations = read_file(t_path)
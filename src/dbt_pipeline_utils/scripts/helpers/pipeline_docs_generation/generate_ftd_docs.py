@@ -1,6 +1,9 @@
 import pandas as pd
 from dbt_pipeline_utils.scripts.helpers.general import *
 from dbt_pipeline_utils.scripts.helpers.common import type_mapping
+from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_common_docs import row_hash_sql, incremental_filter, model_config
+from dbt_pipeline_utils.scripts.helpers.join_planner import JoinPlanner
+from dbt_pipeline_utils.scripts.helpers.processor_registry import data_file_path
 from pathlib import Path
 import yaml
 
@@ -46,41 +49,95 @@ class FTDDocGenClass():
 
         write_file(filepath, dbt_config, overwrite=True)
 
-    def generate_ftd_sql_files(self, column_data):
+    def get_table_sizes(self, profiles=None):
+        """
+        Rows per table when every data file has a column profile, else the data file size in
+        bytes for every table. The sizes are compared, so they are never mixed.
+        """
+        profiles = profiles or {}
+        if all(profiles.get(table_id) for table_id in self.data_files):
+            return {table_id: next(iter(profiles[table_id].values()))["rows"] for table_id in self.data_files}
+
+        sizes = {}
+        for table_id, table_info in self.data_files.items():
+            import_type = (self.data_dictionary.get(table_id) or {}).get("import_type")
+            filepath = data_file_path(self.paths["src_data_dir"], table_info, import_type)
+            sizes[table_id] = filepath.stat().st_size if filepath.is_file() else 0
+        return sizes
+
+    def generate_ftd_sql_files(self, column_data, profiles=None):
+        """profiles: optional data file profiles, used to order the joins by table size."""
 
         src_table_columns = {
             table_id: {col[1] for col in column_data.get(f"{self.study_id}_stg_{table_id}", [])}
             for table_id in self.data_dictionary.keys()
         }
+        planner = JoinPlanner(src_table_columns, self.data_files, self.get_table_sizes(profiles))
 
         for table_id in self.ftd_dd.keys():
             new_table = f"{self.study_id}_ftd_{table_id}"
             filepath = self.paths["dbtp_ftdc_study_dir"] / f"{new_table}.sql" 
 
             column_definitions = []
+            column_names = []
             joins = []
+            needed = set()
+            unmapped = []
 
             for col_name, f_col_name, _, col_data_type, _, comment, src_var_name, _  in column_data.get(new_table, []):
                 sql_type = type_mapping.get(col_data_type, "text")
 
-                alias = 'GEN_UNKNOWN'
-                for src_id, cols in src_table_columns.items():
-                    if src_var_name in cols:
-                        alias = src_id
-                        break
-
-                src_col=f'{alias}.{src_var_name}'
                 if "Foreign Key:" in comment or src_var_name == 'id':
                     src_col = f"  {{{{ generate_global_id(prefix='',descriptor=[''], study_id='{self.study_id}') }}}}"
+                else:
+                    alias = planner.resolve(src_var_name, new_table)
+                    if alias is None:
+                        alias = 'GEN_UNKNOWN'
+                        unmapped.append(src_var_name)
+                    else:
+                        needed.add(alias)
+                    src_col=f'{alias}.{src_var_name}'
 
                 column_definitions.append(f'{src_col}::{sql_type} as "{f_col_name}"')
+                column_names.append(f_col_name)
+
+            if unmapped:
+                logger.warning(f"{new_table}: no stg table has {unmapped}, they are selected from GEN_UNKNOWN")
+
+            base_table, planned_joins = planner.plan(needed, new_table)
+            for src_id, condition in planned_joins:
+                joins.append(f"join {{{{ ref('{self.study_id}_stg_{src_id}') }}}} as {src_id}\non {condition} ")
 
-            base_table = list(src_table_columns.keys())[0]
-            for src_id in src_table_columns.keys():
-                if src_id != base_table:
-                    joins.append(f"join {{{{ ref('{self.study_id}_stg_{src_id}') }}}} as {src_id}\non {self.get_join_conditions(src_id)} ")
+            id_columns = [col for col in column_names if col.endswith("_id")]
+
+            if self.get_materialization() == "incremental":
+                configured = self.study_config.get("ftd_unique_keys", {}).get(table_id)
+                unique_key = self.get_unique_key(table_id, configured, id_columns, "ftd_row_hash")
+                indexes = self.index_config(["ftd_row_hash", *id_columns])
+                sql_content = f"""{self.incremental_config(unique_key, schema=f'{self.study_id}_data', **indexes)}
+
+with ftd as (
+select 
+{",\n  ".join(column_definitions)}
+from {{{{ ref('{self.study_id}_stg_{base_table}') }}}} as {base_table}
+{' '.join(joins)}
+),
+
+hashed as (
+    select
+      {row_hash_sql("ftd", column_names)} AS ftd_row_hash,
+      ftd.*
+    from ftd
+)
+
+select hashed.*
+from hashed
+{incremental_filter("hashed", "ftd_row_hash")}
+"""
+                write_file(filepath, sql_content)
+                continue
 
-            sql_content = f"""{{{{ config(materialized='table', schema='{self.study_id}_data') }}}}
+            sql_content = f"""{model_config(materialized='table', schema=f'{self.study_id}_data', **self.index_config(id_columns))}
 
 select 
 {",\n  ".join(column_definitions)}
@@ -135,7 +192,7 @@ from {{{{ ref('{self.study_id}_stg_{base_table}') }}}} as {base_table}
 
             ddict = table_info.get("stg_src_table_id")
             ddict_full_path = src_dd_path / ddict
-            df = read_file(ddict_full_path)
+            df = read_file(ddict_full_path, dtype=str)
             df = df.astype(str).fillna("FTD_UNKNOWN")
 
             column_data[stg_table_key] = self.extract_columns(df, "pipeline_format")
@@ -145,7 +202,7 @@ from {{{{ ref('{self.study_id}_stg_{base_table}') }}}} as {base_table}
 
             ddict = table_info.get("pipeline_identifier")
             ddict_full_path = ftd_study_path / ddict
-            df = read_file(ddict_full_path)
+            df = read_file(ddict_full_path, dtype=str)
             df = df.astype(str).fillna("FTD_UNKNOWN")
 
             column_data[table_key] = self.extract_columns(df, "pipeline_format")
@@ -1,7 +1,11 @@
 import json
+import shlex
 from dbt_pipeline_utils.scripts.helpers.general import *
 import subprocess
 
+# Set by the run script: $DBT_THREADS if exported, else the number of cores.
+THREADS_LINE = 'DBT_THREADS="${DBT_THREADS:-$(nproc 2>/dev/null || sysctl -n hw.ncpu 2>/dev/null || echo 4)}"'
+
 class RunScriptClass():
 
     def generate_run_command(self, operation, model, args=None):
@@ -19,43 +23,85 @@ class RunScriptClass():
             all_args = f"--vars '{json.dumps(args)}'" if args else ""
             op = f"dbt test --select +{model} {all_args}".strip()
 
+        if operation == "build":
+            # model: a list of selection methods, built as one union selection.
+            all_args = f"--vars '{json.dumps(args)}'" if args else ""
+            op = f'dbt build --select {" ".join(model)} --threads "$DBT_THREADS" {all_args} $FULL_REFRESH'.strip()
+
         return op
 
     def generate_dbt_run_script(self):
-        """Generates a dbt run Bash script dynamically based on a YAML configuration."""
+        """
+        Generates a dbt run Bash script dynamically based on a YAML configuration.
+
+        The script takes two options:
+         --slim: rebuild only the models modified since the last successful run
+           (state:modified+), deferring unchanged upstream models to their existing relations.
+           Falls back to a full build when there is no saved state. Only code changes are
+           detected: after process_study reloads the src data, run without --slim.
+         --full-refresh: rebuild seeds and incremental models from scratch, implies a full build.
+        """
         study_id = self.study_id
         scripts_dir = self.paths["dbtp_scripts_dir"]
+        # Kept outside target/, which dbt clean removes.
+        state_dir = f"state/{study_id}"
+        # The src data dir the docs were generated from, the checks must read the same files.
+        src_data_dir = shlex.quote(str(Path(self.paths["src_data_dir"]).resolve()))
 
         commands_list = [
             "#!/bin/bash",
-            "dbt clean",
+            f"# Usage: run_{study_id}.sh [--slim] [--full-refresh]",
+            'SLIM=0',
+            'FULL_REFRESH=""',
+            'for arg in "$@"; do',
+            '  case "$arg" in',
+            '    --slim) SLIM=1 ;;',
+            '    --full-refresh) FULL_REFRESH="--full-refresh" ;;',
+            '    *) echo "Unknown option: $arg. Usage: $0 [--slim] [--full-refresh]"; exit 1 ;;',
+            '  esac',
+            'done',
+            f'STATE_DIR="{state_dir}"',
+            'if [ "$SLIM" = 1 ] && [ -n "$FULL_REFRESH" ]; then echo "--full-refresh: running a full build."; SLIM=0; fi',
+            'if [ "$SLIM" = 1 ] && [ ! -f "$STATE_DIR/manifest.json" ]; then echo "No saved state in $STATE_DIR: running a full build."; SLIM=0; fi',
+            'if [ "$SLIM" = 1 ]; then echo "--slim: rebuilding models whose code changed. Run without --slim after reloading the src data."; fi',
+            'if [ "$SLIM" = 0 ]; then dbt clean; fi',
             'dbt deps || { echo "Error: dbt deps failed. Exiting..."; exit 1; }',
-            "dbt seed #--full-refresh",
+            'if [ "$SLIM" = 1 ]; then dbt seed --select state:modified --state "$STATE_DIR"; else dbt seed $FULL_REFRESH; fi',
+            f'python -m dbt_pipeline_utils.scripts.preflight_checks -s {study_id} -f {src_data_dir} || {{ echo "Error: pre-flight data checks failed. Exiting..."; exit 1; }}',
         ]
 
-        commands_list.append("# Run Target tables") 
+        commands_list.append("# Run and test the ftd and target tables in one dbt build") 
 
-        tgt_tables = {}
+        # One invocation parses the project once, builds each shared upstream stg model once
+        # and runs independent models, and their tests, in parallel.
+        source_tables = {}
         all_tables = []
 
         for table_id, table_info in self.ftd_dd.items():
             src_table = f"{self.study_id}_ftd_{table_id}"
-            tgt_tables[f"{table_id}"] = {
-                "source_table": src_table,
-                "target_schema": f"{self.study_id}_tgt_data",
-            }
-            all_tables.append(src_table)
-
-        for table in all_tables:
-            commands_list.append(self.generate_run_command("model", table))
-
-        for table in all_tables:
-            commands_list.append(self.generate_run_command("test", table))
-
-        for table, args in tgt_tables.items():
-            commands_list.append(
-                self.generate_run_command("model", f"tgt_{table}", args)
-            )
+            source_tables[table_id] = src_table
+            all_tables.extend([src_table, f"tgt_{table_id}"])
+
+        # tgt models read their source_table from source_tables, keyed by table_id.
+        build_vars = {
+            "source_tables": source_tables,
+            "target_schema": f"{self.study_id}_tgt_data",
+        }
+
+        full_build = self.generate_run_command("build", [f"+{table}" for table in all_tables], build_vars)
+        # Intersections: only this study's models that changed, and everything downstream of them.
+        slim_build = self.generate_run_command("build", [f"state:modified+,+{table}" for table in all_tables], build_vars)
+
+        commands_list.extend([
+            THREADS_LINE,
+            'if [ "$SLIM" = 1 ]; then',
+            f'  {slim_build} --defer --state "$STATE_DIR" || {{ echo "Error: dbt build failed. Exiting..."; exit 1; }}',
+            'else',
+            f'  {full_build} || {{ echo "Error: dbt build failed. Exiting..."; exit 1; }}',
+            'fi',
+            "# Save the manifest for the next --slim run",
+            'mkdir -p "$STATE_DIR" && cp target/manifest.json "$STATE_DIR/manifest.json"',
+        ])
 
         # Final script content
         data = "\n".join(commands_list) + "\n"
@@ -65,4 +111,4 @@ class RunScriptClass():
         write_file(filepath, data, overwrite=False)
 
         # Edit script permissions
-        subprocess.run(["chmod", "+x", filepath], check=True)
\ No newline at end of file
+        subprocess.run(["chmod", "+x", filepath], check=True)
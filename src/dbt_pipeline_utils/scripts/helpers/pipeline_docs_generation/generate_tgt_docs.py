@@ -34,7 +34,7 @@ class TgtDocGenClass():
 
             sql_content = f"""{{{{ config(schema=var('target_schema')) }}}}
 
-{{% set source_table = (var('source_table') | default(none)) %}}
+{{% set source_table = var('source_tables', {{}}).get('{table_id}') or (var('source_table', none)) %}}
 
 {{% if source_table is not none %}}
     {{% do log("Using source_table: " ~ source_table, info=True) %}}
@@ -1,11 +1,10 @@
-import pandas as pd
-
-def generate_model_docs(df_obj):
-    """Main function to generate dbt model files, loading column data once."""
+def generate_model_docs(df_obj, profiles=None):
+    """Main function to generate dbt model files, loading column data once.
+    profiles: optional data file profiles, see DocGeneration.profile_data_files."""
     
     df_obj.generate_dbt_project_yaml()
 
-    df_obj.generate_stg_dds()
+    df_obj.generate_stg_dds(profiles)
 
     column_data = df_obj.load_src_column_data()
 
@@ -26,8 +25,9 @@ def generate_model_docs(df_obj):
         df_obj.paths["dbtp_src_study_model_dir"]
     )
 
-def generate_ftd_model_docs(df_obj):
-    """Main function to generate dbt model files, loading column data once."""
+def generate_ftd_model_docs(df_obj, profiles=None):
+    """Main function to generate dbt model files, loading column data once.
+    profiles: optional data file profiles, used to order the ftd joins by table size."""
 
     # NOTE: The data/project_id/ftd_study.yaml is also generated. See generate_docs.generate_ftd_study_yaml.
 
@@ -37,7 +37,7 @@ def generate_ftd_model_docs(df_obj):
 
     df_obj.generate_dbt_models_yml(column_data, df_obj.paths["dbtp_ftdc_study_docs_dir"], ftd_model=True)
     
-    df_obj.generate_ftd_sql_files(column_data)
+    df_obj.generate_ftd_sql_files(column_data, profiles)
 
     df_obj.generate_ftd_dbt_project_yaml()
     
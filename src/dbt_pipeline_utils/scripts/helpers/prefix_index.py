@@ -0,0 +1,138 @@
+'''
+Compiled index of ontology CURIE prefixes, built from data/refs/ftd_ontology_lookup.csv.
+
+The lookup holds one row per ontology:
+ - curie, system: the prefix and its system url (the onto_data passed to search_dragon)
+ - alias_of: optional, the prefix this one is another name for, e.g. HPO -> HP
+ - {api}_prefix: optional, the prefix the api expects for this ontology, e.g. umls_prefix HP -> HPO
+
+Adding an ontology, alias or api specific prefix is a data row/cell, not a code change.
+
+The compiled index is written to a marshal cache file, keyed by INDEX_VERSION and the lookup
+file's size and mtime, so later runs load it without parsing the csv. marshal only holds the
+plain dicts, so loading a cache file never runs code.
+'''
+
+import csv
+import os
+import marshal
+from pathlib import Path
+import dbt_pipeline_utils
+from dbt_pipeline_utils import logger
+from dbt_pipeline_utils.scripts.helpers.common import USER_CACHE_DIR
+
+# Bump when the compiled structure changes, old cache files are then ignored.
+INDEX_VERSION = 1
+
+LOOKUP_PATH = Path(dbt_pipeline_utils.__file__).resolve().parent / 'data/refs/ftd_ontology_lookup.csv'
+CACHE_DIR = USER_CACHE_DIR
+
+_loaded = {}
+
+
+class PrefixIndex():
+    def __init__(self, systems, canonical, api_prefixes):
+        self.systems = systems  # prefix -> system url
+        self.canonical = canonical  # alias prefix -> canonical prefix
+        self.api_prefixes = api_prefixes  # api -> {prefix: prefix the api expects}, only prefixes that change
+
+    @classmethod
+    def from_lookup(cls, lookup_path=LOOKUP_PATH):
+        systems = {}
+        canonical = {}
+        with open(lookup_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            api_columns = {col: col[:-len("_prefix")] for col in reader.fieldnames if col.endswith("_prefix")}
+            rows = list(reader)
+
+        for row in rows:
+            systems[row["curie"]] = row["system"]
+            if row.get("alias_of"):
+                canonical[row["curie"]] = row["alias_of"]
+
+        api_prefixes = {api: {} for api in api_columns.values()}
+        api_form = {}
+        for row in rows:
+            for col, api in api_columns.items():
+                if row.get(col):
+                    api_form.setdefault(api, {})[row["curie"]] = row[col]
+
+        # Resolve every prefix through its alias first, so HPO and HP both map to what the api expects for HP.
+        for prefix in systems:
+            target = canonical.get(prefix, prefix)
+            for api in api_prefixes:
+                converted = api_form.get(api, {}).get(target, target)
+                if converted != prefix:
+                    api_prefixes[api][prefix] = converted
+
+        return cls(systems, canonical, api_prefixes)
+
+    @staticmethod
+    def _swap(codes, mapping):
+        swapped = []
+        for code in codes:
+            prefix, sep, local_id = code.partition(":")
+            if sep and prefix in mapping:
+                code = f"{mapping[prefix]}:{local_id}"
+            swapped.append(code)
+        return swapped
+
+    def to_api(self, codes, api):
+        """Returns codes with each prefix converted to the form api expects."""
+        # Apis without a {api}_prefix column only need aliases resolved.
+        return self._swap(codes, self.api_prefixes.get(api, self.canonical))
+
+    def normalize(self, codes):
+        """Strips whitespace, uppercases prefixes and resolves aliases, so duplicates collapse."""
+        normalized = []
+        for code in codes:
+            prefix, sep, local_id = code.strip().partition(":")
+            if sep:
+                prefix = prefix.strip().upper()
+                code = f"{self.canonical.get(prefix, prefix)}:{local_id.strip()}"
+            else:
+                code = prefix
+            normalized.append(code)
+        return normalized
+
+    def dumps(self):
+        return marshal.dumps((self.systems, self.canonical, self.api_prefixes))
+
+    @classmethod
+    def loads(cls, data):
+        systems, canonical, api_prefixes = marshal.loads(data)
+        if not all(isinstance(d, dict) for d in (systems, canonical, api_prefixes)):
+            raise ValueError("Unexpected prefix index cache contents")
+        return cls(systems, canonical, api_prefixes)
+
+
+def _cache_path(lookup_path):
+    stat = os.stat(lookup_path)
+    return CACHE_DIR / f"prefix_index_v{INDEX_VERSION}_{stat.st_size}_{stat.st_mtime_ns}.marshal"
+
+
+def load_prefix_index(lookup_path=LOOKUP_PATH):
+    """Returns the compiled index, from memory, the cache file, or by compiling the lookup."""
+    if lookup_path in _loaded:
+        return _loaded[lookup_path]
+
+    cache_path = _cache_path(lookup_path)
+    index = None
+    if cache_path.exists():
+        try:
+            index = PrefixIndex.loads(cache_path.read_bytes())
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable prefix index cache {cache_path}: {e}")
+
+    if index is None:
+        index = PrefixIndex.from_lookup(lookup_path)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(index.dumps())
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug(f"Could not write prefix index cache {cache_path}: {e}")
+
+    _loaded[lookup_path] = index
+    return index
@@ -0,0 +1,137 @@
+'''
+Pre-flight data quality checks. Evaluates the tests declared in the stg data dictionaries
+(see model_tests.format_tests) directly against the src csvs with an embedded DuckDB,
+before anything is loaded or materialized.
+
+Each table is checked in one scan: every test becomes a count(*) FILTER (...) of the same
+SELECT. Sample rows are only queried for the checks that fail.
+
+Supported tests: not_null, accepted_values. Like the stg model, accepted_values casts the
+column to its dictionary type first, a value that doesn't cast fails the check.
+'''
+
+from pathlib import Path
+from dbt_pipeline_utils import logger
+
+DEFAULT_SAMPLES = 5
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def stg_checks(stg_columns):
+    """
+    stg_columns: extract_columns output of a stg dictionary.
+    Returns [(src column, test, accepted values or None, sql type)]. Columns added in the stg
+    model, without a src_variable_name, have no csv column to check and are skipped.
+    """
+    from dbt_pipeline_utils.scripts.helpers.common import type_mapping
+    from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.model_tests import format_tests
+
+    checks = []
+    for _, _, _, data_type, enums, _, src_variable_name, tests in stg_columns:
+        # Empty dictionary cells are read as NaN.
+        if not isinstance(tests, str) or not isinstance(src_variable_name, str):
+            continue
+        # The same cast as the stg model's "col"::{sql_type}.
+        sql_type = type_mapping.get(data_type, "text")
+        for test in format_tests(tests, enums if isinstance(enums, str) else None):
+            if test == "not_null":
+                checks.append((src_variable_name, "not_null", None, sql_type))
+            elif isinstance(test, dict) and "accepted_values" in test:
+                checks.append((src_variable_name, "accepted_values", test["accepted_values"]["values"], sql_type))
+    return checks
+
+
+def failure_condition(column, test, values, sql_type="text"):
+    col = quote_identifier(column)
+    if test == "not_null":
+        return f"{col} IS NULL"
+    # Like dbt's accepted_values, nulls are not failures.
+    if sql_type == "text":
+        return f"{col} IS NOT NULL AND {col} NOT IN ({', '.join(quote_literal(v) for v in values)})"
+    # A value that doesn't cast would fail the stg model, it is reported here.
+    cast = f"TRY_CAST({col} AS {sql_type})"
+    accepted = ", ".join(f"TRY_CAST({quote_literal(v)} AS {sql_type})" for v in values)
+    return f"{col} IS NOT NULL AND ({cast} IS NULL OR {cast} NOT IN ({accepted}))"
+
+
+def csv_relation(csv_path):
+    # all_varchar: compare the text as written, don't let type sniffing turn '01' into 1.
+    return f"read_csv({quote_literal(csv_path)}, header=true, all_varchar=true)"
+
+
+def check_table(conn, csv_path, checks, samples=DEFAULT_SAMPLES):
+    """Returns [(column, test, failing rows, [(data row number, value)])] for the checks that fail."""
+    if not checks:
+        return []
+
+    # Checks on columns missing from the csv are reported by validate_data_file_headers.
+    header = {row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {csv_relation(csv_path)}").fetchall()}
+    checks = [check for check in checks if check[0] in header]
+    if not checks:
+        return []
+
+    counts = ",\n    ".join(
+        f"count(*) FILTER (WHERE {failure_condition(*check)})" for check in checks
+    )
+    row = conn.execute(f"SELECT\n    {counts}\nFROM {csv_relation(csv_path)}").fetchone()
+
+    failures = []
+    for (column, test, values, sql_type), failed in zip(checks, row):
+        if not failed:
+            continue
+        sample = conn.execute(
+            f"SELECT data_row, {quote_identifier(column)} FROM "
+            f"(SELECT row_number() OVER () AS data_row, * FROM {csv_relation(csv_path)}) "
+            f"WHERE {failure_condition(column, test, values, sql_type)} ORDER BY data_row LIMIT {int(samples)}"
+        ).fetchall()
+        failures.append((column, test, failed, sample))
+    return failures
+
+
+def run_preflight_checks(study_config, src_data_dir, samples=DEFAULT_SAMPLES):
+    """
+    Checks every table's data file against the tests in its stg dictionary.
+    Returns {table_id: failures}, see check_table. Tables in data_files whose stg dictionary
+    or data file is not found map to None, an error.
+    """
+    import duckdb
+    from dbt_pipeline_utils.scripts.helpers.general import read_file
+    from dbt_pipeline_utils.scripts.helpers.processor_registry import data_file_path
+    from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_common_docs import DocGeneration
+
+    src_data_dir = Path(src_data_dir)
+    extractor = DocGeneration()
+    report = {}
+
+    with duckdb.connect() as conn:
+        for table_id, table_info in study_config["data_dictionary"].items():
+            data_info = study_config["data_files"].get(table_id)
+            if not data_info:
+                logger.debug(f"Skipping pre-flight checks for {table_id}, it has no data file")
+                continue
+            stg_dd_path = src_data_dir / Path(f"{table_info.get('stg_src_table_id')}")
+            # Synapse tables are downloaded to their src_file_id, not their identifier.
+            csv_path = data_file_path(src_data_dir, data_info, table_info.get("import_type"))
+
+            missing = [str(path) for path in [stg_dd_path, csv_path] if not path.exists()]
+            if missing:
+                logger.error(f"{table_id}: stg dictionary or data file not found: {missing}")
+                report[table_id] = None
+                continue
+
+            checks = stg_checks(extractor.extract_columns(read_file(stg_dd_path, dtype=str), "pipeline_format"))
+            report[table_id] = check_table(conn, str(csv_path), checks, samples)
+
+            for column, test, failed, sample in report[table_id]:
+                examples = ", ".join(f"row {row}: {value!r}" for row, value in sample)
+                logger.error(f"{table_id}.{column} fails {test} on {failed} rows, e.g. {examples}")
+            logger.debug(f"{table_id}: {len(checks)} pre-flight checks, {len(report[table_id])} failed")
+
+    return report
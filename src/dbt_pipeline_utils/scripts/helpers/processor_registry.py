@@ -0,0 +1,102 @@
+'''
+Maps a table's `import_type` to the data processor class that handles it.
+
+Processors are registered as "module:Class" targets and only imported on first use.
+Other packages can add or replace processors without forking this one by declaring
+an entry point in the `dbt_pipeline_utils.processors` group, e.g. in their pyproject.toml:
+
+[project.entry-points."dbt_pipeline_utils.processors"]
+pg_fast = "my_package.loaders:FastPostgresFileProcessor"
+'''
+
+from importlib import import_module
+from importlib.metadata import entry_points
+from pathlib import Path
+from dbt_pipeline_utils import logger
+
+ENTRY_POINT_GROUP = "dbt_pipeline_utils.processors"
+
+# Used when the package metadata is unavailable, e.g. running from a source checkout.
+BUILTIN_PROCESSORS = {
+    "synapse": "dbt_pipeline_utils.scripts.helpers.databases.sql_server:SynapseFileProcessor",
+    "pg": "dbt_pipeline_utils.scripts.helpers.databases.postgres:PostgresFileProcessor",
+    "duckdb": "dbt_pipeline_utils.scripts.helpers.databases.duckdb:DuckDBFileProcessor",
+}
+
+_targets = {}  # import_type -> "module:Class" string, EntryPoint or class
+_loaded = {}  # import_type -> class
+_discovered = False
+
+
+def _discover():
+    """Collects the builtin processors and any installed entry points, once."""
+    global _discovered
+    if _discovered:
+        return
+
+    for import_type, target in BUILTIN_PROCESSORS.items():
+        _targets.setdefault(import_type, target)
+
+    # Installed entry points take precedence over the builtins.
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        _targets[ep.name] = ep
+        logger.debug(f"Registered processor entry point {ep.name}: {ep.value}")
+
+    _discovered = True
+
+
+def _load_target(target):
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        return getattr(import_module(module_name), attr)
+    if hasattr(target, "load"):
+        return target.load()
+    return target
+
+
+def register_processor(import_type, target):
+    """
+    Registers a processor for an import_type at runtime.
+    target: a processor class, or a "module:Class" string that is imported on first use.
+    """
+    _discover()
+    _loaded.pop(import_type, None)
+    _targets[import_type] = target
+
+
+def available_import_types():
+    _discover()
+    return sorted(_targets)
+
+
+def get_processor_class(import_type):
+    """Returns the processor class for import_type, importing its module on first use."""
+    if import_type in _loaded:
+        return _loaded[import_type]
+
+    _discover()
+    if import_type not in _targets:
+        raise ValueError(f"Unsupported file import type: {import_type}. Choices {available_import_types()}")
+
+    processor_class = _load_target(_targets[import_type])
+    _loaded[import_type] = processor_class
+    logger.debug(f"Loaded processor for {import_type}: {processor_class.__name__}")
+    return processor_class
+
+
+def data_file_path(src_data_dir, data_info, import_type=None):
+    """
+    The local file a data_files entry is loaded from, the processor's src_data_csv: named by
+    its ddict_key, e.g. src_file_id for synapse downloads, identifier for local files.
+    import_type: used when the data_files entry doesn't set one, e.g. its data_dictionary's.
+    """
+    processor_class = get_processor_class(data_info.get("import_type") or import_type)
+    return Path(src_data_dir) / Path(f"{data_info.get(processor_class.ddict_key)}")
+
+
+def get_capabilities(import_type):
+    """
+    Returns the backend capabilities declared by the processor, e.g.
+    {"parallel_load": True, "bulk_copy": True}. See DatabaseBC.capabilities.
+    """
+    return dict(get_processor_class(import_type).capabilities)
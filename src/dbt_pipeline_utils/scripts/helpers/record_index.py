@@ -0,0 +1,184 @@
+'''
+Sidecar index of record offsets for large csvs, so parallel workers can go straight to a
+range of rows instead of scanning for record boundaries themselves.
+
+The file is memory mapped and scanned once, a block at a time with numpy. The same quote
+parity rule as csv_ranges applies: a newline ends a record only outside a quoted field.
+The offset of every `every`-th data row is kept, rows in between are found by scanning
+forward from the nearest kept offset, at most every - 1 records.
+
+The index is cached in CACHE_DIR, a per-user directory, keyed by the file's path, size and
+mtime and `every`, so later runs and other processes load it without scanning the file.
+
+    with RecordIndex.load(path) as index:
+        for start_row, end_row in index.row_ranges(workers):
+            ...  # in each worker
+        rows = index.slice(start_row, end_row)  # memoryview of the mmap, no copy
+'''
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+from dbt_pipeline_utils import logger
+from dbt_pipeline_utils.scripts.helpers.common import USER_CACHE_DIR
+from dbt_pipeline_utils.scripts.helpers.csv_ranges import BLOCK_SIZE, QUOTE, NEWLINE, _record_end
+
+# Bump when the cached structure changes, old cache files are then ignored.
+INDEX_VERSION = 1
+
+DEFAULT_EVERY = 10_000
+CACHE_DIR = USER_CACHE_DIR / "record_index"
+
+
+def fingerprint(filepath, every):
+    path = Path(filepath).resolve()
+    stat = path.stat()
+    key = f"{INDEX_VERSION}|{path}|{stat.st_size}|{stat.st_mtime_ns}|{every}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def scan_offsets(mm, size, every):
+    """
+    Returns (offsets, records): the start offsets of data rows 0, every, 2 * every, ...
+    and the number of records, header included.
+    """
+    import numpy as np
+
+    checkpoints = []
+    record_ends = 0
+    in_quotes = 0
+
+    for start in range(0, size, BLOCK_SIZE):
+        block = mm[start:start + BLOCK_SIZE]
+        data = np.frombuffer(block, dtype=np.uint8)
+        newlines = data == NEWLINE
+
+        if b'"' in block:
+            quotes = np.cumsum(data == QUOTE, dtype=np.uint8)
+            quotes += np.uint8(in_quotes)
+            ends = np.flatnonzero(newlines & ((quotes & 1) == 0))
+            in_quotes = int(quotes[-1] & 1)
+        elif in_quotes:
+            ends = np.empty(0, dtype=np.int64)
+        else:
+            ends = np.flatnonzero(newlines)
+
+        # The n-th record end (1-based, over the file) is where data row n - 1 starts.
+        numbers = np.arange(record_ends + 1, record_ends + 1 + len(ends))
+        checkpoints.append(ends[(numbers - 1) % every == 0] + start + 1)
+        record_ends += len(ends)
+
+    offsets = np.concatenate(checkpoints) if checkpoints else np.empty(0, dtype=np.int64)
+    # An offset at the end of the file is past the last record, not a row start.
+    offsets = offsets[offsets < size].astype(np.int64)
+
+    records = record_ends + (1 if size and mm[size - 1:size] != b"\n" else 0)
+    return offsets, records
+
+
+class RecordIndex():
+    def __init__(self, filepath, offsets, rows, every):
+        """
+        offsets: start offsets of data rows 0, every, 2 * every, ... (numpy int64 array).
+        rows: number of data rows, the header is not counted.
+        """
+        self.filepath = Path(filepath)
+        self.offsets = offsets
+        self.rows = rows
+        self.every = every
+
+        self._file = open(self.filepath, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.header_end = int(offsets[0]) if len(offsets) else self.size
+
+    @classmethod
+    def build(cls, filepath, every=DEFAULT_EVERY):
+        """Scans the file. Compressed files can't be memory mapped and are not supported."""
+        from dbt_pipeline_utils.scripts.helpers.general import split_compression
+        import numpy as np
+
+        if split_compression(filepath)[1]:
+            raise ValueError(f"Can't index compressed file {filepath}")
+
+        size = os.path.getsize(filepath)
+        if size == 0:
+            return cls(filepath, np.empty(0, dtype=np.int64), 0, every)
+
+        with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets, records = scan_offsets(mm, size, every)
+        logger.debug(f"Indexed {records} records of {filepath}, every {every} rows")
+        return cls(filepath, offsets, max(records - 1, 0), every)
+
+    @classmethod
+    def load(cls, filepath, every=DEFAULT_EVERY, cache_dir=None):
+        """Returns the index from the cache, or builds it and writes it to the cache."""
+        import numpy as np
+
+        cache_path = Path(cache_dir or CACHE_DIR) / f"{fingerprint(filepath, every)}.npz"
+        if cache_path.exists():
+            try:
+                with np.load(cache_path, allow_pickle=False) as cached:
+                    return cls(filepath, cached["offsets"], int(cached["rows"]), every)
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable record index cache {cache_path}: {e}")
+
+        index = cls.build(filepath, every)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp.npz")
+            np.savez(tmp_path, offsets=index.offsets, rows=np.int64(index.rows))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug(f"Could not write record index cache {cache_path}: {e}")
+        return index
+
+    def row_offset(self, row):
+        """Byte offset where data row `row` (0-based) starts, the file size past the last row."""
+        if row >= self.rows:
+            return self.size
+        checkpoint, skip = divmod(row, self.every)
+        offset = int(self.offsets[checkpoint])
+        if skip:
+            next_checkpoint = int(self.offsets[checkpoint + 1]) if checkpoint + 1 < len(self.offsets) else self.size
+            block = self.mm[offset:next_checkpoint]
+            # A checkpoint is a record start, so no quote is open before it.
+            position = 0
+            for _ in range(skip):
+                position = _record_end(block, position, 0)
+            offset += position
+        return offset
+
+    def byte_range(self, start_row, end_row):
+        """(start, end) bytes of data rows [start_row, end_row)."""
+        return self.row_offset(start_row), self.row_offset(end_row)
+
+    def row_ranges(self, parts):
+        """Splits the data rows into at most `parts` (start_row, end_row) ranges, on indexed rows."""
+        checkpoints = len(self.offsets)
+        step = max(-(-checkpoints // max(parts, 1)), 1)
+        starts = [i * self.every for i in range(0, checkpoints, step)]
+        return [(start, min(end, self.rows)) for start, end in zip(starts, starts[1:] + [self.rows])]
+
+    def header(self):
+        return bytes(self.mm[:self.header_end])
+
+    def slice(self, start_row, end_row):
+        """
+        memoryview of data rows [start_row, end_row), read straight from the mmap.
+        Release it before closing the index.
+        """
+        start, end = self.byte_range(start_row, end_row)
+        return memoryview(self.mm)[start:end]
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,184 @@
+'''
+On-disk cache of ontology search responses, shared by every run and user on a host.
+
+Responses are stored in SQLite, keyed by (api, normalized keyword, ontologies, page params).
+Entries older than the TTL are treated as misses and refreshed on the next search, but kept
+so offline runs can still use them. The least recently used entries are evicted once the
+cache holds more than max_entries. WAL mode lets several processes read
+while one writes.
+
+The database file is created world writable before SQLite opens it, SQLite gives its -wal
+and -shm files the same mode, so every user can open the cache. A cache that can't be read
+or written is logged and the searches run without it.
+'''
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from dbt_pipeline_utils import logger
+
+# Set to a path every user can write to, to share one cache on a host.
+CACHE_PATH_ENV = "DBT_PIPELINE_UTILS_SEARCH_CACHE"
+DEFAULT_CACHE_PATH = Path(tempfile.gettempdir()) / "dbt_pipeline_utils" / "search_cache.sqlite"
+
+DEFAULT_TTL = 30 * 24 * 60 * 60  # seconds
+DEFAULT_MAX_ENTRIES = 500_000
+
+# Eviction runs once every this many writes, not on every write.
+EVICT_EVERY = 1000
+
+
+def default_cache_path():
+    return Path(os.getenv(CACHE_PATH_ENV, DEFAULT_CACHE_PATH))
+
+
+def normalize_keyword(keyword):
+    return str(keyword).strip().upper()
+
+
+def cache_key(api, keyword, params=()):
+    """params: anything else that changes the response, e.g. ontologies and page params."""
+    raw = json.dumps([api, normalize_keyword(keyword), [str(p) for p in params]])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SearchCache():
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path) if path else default_cache_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disabled = False
+
+        try:
+            self._share()
+            self._connection().executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    api TEXT NOT NULL,
+                    keyword TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+            """)
+        except (OSError, sqlite3.Error) as e:
+            self._disable(e)
+        logger.debug(f"Search cache: {self.path}")
+
+    def _share(self):
+        """Makes the cache usable by every user on the host."""
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # The sticky bit keeps users from deleting or replacing each other's files, like /tmp.
+            try:
+                os.chmod(self.path.parent, 0o1777)
+            except OSError:
+                pass
+
+        # -wal and -shm files take the database file's mode, it must be set before SQLite
+        # creates them. Files left with the umask's mode are fixed by their owner.
+        try:
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666))
+        except FileExistsError:
+            pass
+        for p in [self.path, Path(f"{self.path}-wal"), Path(f"{self.path}-shm")]:
+            try:
+                if p.stat().st_uid == os.getuid():
+                    os.chmod(p, 0o666)
+            except OSError:
+                pass
+
+    def _disable(self, error):
+        if not self.disabled:
+            logger.warning(f"Search cache {self.path} is not usable, searching without it: {error}")
+        self.disabled = True
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads, keep one per thread.
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def get(self, api, keyword, params=(), allow_expired=False):
+        """Returns the cached response, or None on a miss, an expired entry or a cache error."""
+        if self.disabled:
+            self.misses += 1
+            return None
+        key = cache_key(api, keyword, params)
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (not allow_expired and self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            self._disable(e)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, api, keyword, response, params=()):
+        if self.disabled:
+            return
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO responses (key, api, keyword, response, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(api, keyword, params), api, normalize_keyword(keyword), json.dumps(response), now, now),
+            )
+        except sqlite3.Error as e:
+            self._disable(e)
+            return
+        with self.lock:
+            self.writes += 1
+            evict = self.writes % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drops the least recently used entries above max_entries."""
+        if self.disabled or not self.max_entries:
+            return
+        try:
+            conn = self._connection()
+            count = conn.execute("SELECT count(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                logger.debug(f"Evicted {count - self.max_entries} search cache entries")
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def close(self):
+        """Evicts, then closes the connections of every thread that used the cache."""
+        self.evict()
+        logger.info(f"Search cache: {self.hits} hits, {self.misses} misses, {self.writes} new entries")
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
+        self.local = threading.local()
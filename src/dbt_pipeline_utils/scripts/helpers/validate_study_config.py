@@ -1,4 +1,6 @@
 import os
+import csv
+from concurrent.futures import ThreadPoolExecutor
 from dbt_pipeline_utils import logger
 from pathlib import Path
 
@@ -62,4 +64,127 @@ def validate_study_config(study_config, study_yml_path):
 
     validate_dfs(data_files, study_yml_path, file_ids)
 
-    logger.debug("Validation passed: Study configuration is valid.")
\ No newline at end of file
+    logger.debug("Validation passed: Study configuration is valid.")
+
+
+def read_header(filepath, sample_rows=0):
+    """
+    Reads the header record of a csv, and up to sample_rows records after it.
+    Returns (header, [(line, field count) of sampled records with a different field count than the header]).
+    Other table formats only have their header read.
+    """
+    from dbt_pipeline_utils.scripts.helpers.general import open_file, read_file, split_compression
+
+    if split_compression(filepath)[0] != ".csv":
+        return [str(col) for col in read_file(filepath, header_only=True).columns], []
+
+    with open_file(filepath, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        ragged = []
+        for i, record in enumerate(reader):
+            if i >= sample_rows:
+                break
+            if len(record) != len(header):
+                ragged.append((reader.line_num, len(record)))
+    return header, ragged
+
+
+def _existing_file(src_data_dir, info, keys):
+    for key in keys:
+        if info.get(key):
+            path = src_data_dir / Path(f"{info[key]}")
+            if path.exists():
+                return path
+    return None
+
+
+def compare_columns(header, dd_columns):
+    """
+    header: the data file's column names. dd_columns: extract_columns output for its dictionary.
+    Returns {"missing", "extra", "collisions"}:
+     - missing: dictionary variables that are not in the header
+     - extra: header columns that are not in the dictionary
+     - collisions: formatted_variable_names shared by several header columns or dd variables
+    """
+    from dbt_pipeline_utils.scripts.helpers.general import format_variable_name
+
+    dd_names = [col[0] for col in dd_columns if col[0] is not None]
+    header_set = set(header)
+    dd_set = {str(name) for name in dd_names}
+
+    formatted = {}
+    for name in header:
+        formatted.setdefault(format_variable_name(name), set()).add(name)
+    for name, formatted_name in ((col[0], col[1]) for col in dd_columns if col[0] is not None):
+        formatted.setdefault(formatted_name, set()).add(str(name))
+
+    return {
+        "missing": [str(name) for name in dd_names if str(name) not in header_set],
+        "extra": [name for name in header if name not in dd_set],
+        "collisions": {name: sorted(cols) for name, cols in formatted.items() if len(cols) > 1},
+    }
+
+
+def header_errors(report):
+    return any(report[key] for key in ("missing", "extra", "collisions", "ragged_rows"))
+
+
+def validate_table_header(table_id, dd_path, dd_format, data_path, sample_rows=0):
+    from dbt_pipeline_utils.scripts.helpers.general import read_file
+    from dbt_pipeline_utils.scripts.helpers.pipeline_docs_generation.generate_common_docs import DocGeneration
+
+    header, ragged = read_header(data_path, sample_rows)
+    dd_columns = DocGeneration().extract_columns(read_file(dd_path, dtype=str), dd_format)
+
+    report = compare_columns(header, dd_columns)
+    report["ragged_rows"] = ragged
+    report["header_fields"] = len(header)
+    return report
+
+
+def validate_data_file_headers(study_config, src_data_dir, sample_rows=0, workers=None):
+    """
+    Pre-flight check, before any load: reads only the header (and sample_rows records) of
+    every data file, in parallel, and compares it with its data dictionary's columns.
+    Returns {table_id: report}, see compare_columns. Tables whose files are not local are skipped.
+    """
+    from dbt_pipeline_utils.scripts.helpers.processor_registry import get_processor_class
+    from dbt_pipeline_utils.scripts.helpers.general import split_compression, TABLE_FORMATS
+
+    src_data_dir = Path(src_data_dir)
+    jobs = {}
+    for table_id, table_info in study_config["data_dictionary"].items():
+        data_info = study_config["data_files"].get(table_id) or {}
+        ddict_key = get_processor_class(table_info.get("import_type")).ddict_key
+
+        dd_path = _existing_file(src_data_dir, table_info, [ddict_key, "identifier", "src_file_id"])
+        data_path = _existing_file(src_data_dir, data_info, ["identifier", "src_file_id"])
+        if dd_path is None or data_path is None or split_compression(data_path)[0] not in TABLE_FORMATS:
+            logger.debug(f"Skipping header validation for {table_id}, local files not found")
+            continue
+        jobs[table_id] = (dd_path, table_info.get("format"), data_path)
+
+    reports = {}
+    with ThreadPoolExecutor(max_workers=workers or min(len(jobs), 8) or 1) as pool:
+        futures = {
+            table_id: pool.submit(validate_table_header, table_id, *job, sample_rows)
+            for table_id, job in jobs.items()
+        }
+        for table_id, future in futures.items():
+            reports[table_id] = future.result()
+
+    for table_id, report in reports.items():
+        data_path = jobs[table_id][2]
+        if report["missing"]:
+            logger.error(f"{table_id}: dictionary columns missing from {data_path.name}: {report['missing']}")
+        if report["extra"]:
+            logger.error(f"{table_id}: {data_path.name} columns not in the dictionary: {report['extra']}")
+        for formatted_name, cols in report["collisions"].items():
+            logger.error(f"{table_id}: {cols} all become column {formatted_name}")
+        for line, count in report["ragged_rows"]:
+            logger.error(f"{table_id}: {data_path.name} line {line} has {count} fields, the header has {report['header_fields']}")
+        if not header_errors(report):
+            logger.debug(f"{table_id}: {data_path.name} header matches its dictionary")
+
+    return reports
@@ -0,0 +1,57 @@
+"""
+Evaluates the tests declared in the stg data dictionaries against the src csvs with an
+embedded DuckDB, so failures are found before the dbt run. Exits 1 when a check fails, or
+when a table's stg dictionary or data file is not found.
+
+python src/dbt_pipeline_utils/scripts/preflight_checks.py -s 'study_id'
+"""
+
+import argparse
+import sys
+from dbt_pipeline_utils.scripts.helpers.general import *
+from dbt_pipeline_utils.scripts.helpers.preflight_checks import run_preflight_checks, DEFAULT_SAMPLES
+from dbt_pipeline_utils import logger
+
+
+def main(study_id, src_data_path=None, samples=DEFAULT_SAMPLES):
+    """Returns True when every check passes."""
+    try:
+        import duckdb
+    except ImportError:
+        logger.warning("duckdb is not installed, skipping pre-flight checks.")
+        return True
+
+    paths = get_paths(study_id, None, src_data_path=src_data_path)
+    study_config = read_file(paths["study_yml_path"])
+
+    report = run_preflight_checks(study_config, paths["src_data_dir"], samples=samples)
+
+    missing = [table_id for table_id, failures in report.items() if failures is None]
+    failed = [table_id for table_id, failures in report.items() if failures]
+    if missing:
+        logger.error(f"❌ Data files or stg dictionaries not found for: {missing}, check the src data path")
+    if failed:
+        logger.error(f"❌ Pre-flight checks failed for: {failed}")
+    if missing or failed:
+        return False
+
+    logger.info(f"✅ Pre-flight checks passed for {len(report)} tables")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the src data files against the tests in the stg data dictionaries.")
+
+    parser.add_argument("-s", "--study_id", required=True, help="The study id, as in {study_id}_study.yaml")
+    parser.add_argument(
+        "-f",
+        "--filepath",
+        required=False,
+        help="Path to the directory containing src data files. If not set, defaults to the {dbt project}/data path",
+    )
+    parser.add_argument("-n", "--samples", required=False, default=DEFAULT_SAMPLES, type=int, help="Failing values shown per check")
+
+    args = parser.parse_args()
+
+    if not main(study_id=args.study_id, src_data_path=args.filepath, samples=args.samples):
+        sys.exit(1)
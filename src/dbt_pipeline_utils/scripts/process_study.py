@@ -1,13 +1,91 @@
 import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from dbt_pipeline_utils.scripts.helpers.general import *
 # from dbt_pipeline_utils.scripts.helpers.common import *
 from dbt_pipeline_utils.scripts.helpers.validate_study_config import *
 from dbt_pipeline_utils.scripts.helpers.factory_functions import *
+from dbt_pipeline_utils.scripts.helpers.csv_ranges import count_data_rows
 from dbt_pipeline_utils import logger
 
 
-def main(study_id, src_data_path):
+def load_table(dfile, fast_load=False, unlogged=False, replace_load=False):
+    """Imports one data file, returns the load time in seconds."""
+    start = time.perf_counter()
+    if replace_load and dfile.capabilities.get("replace_load"):
+        dfile.replace_load_data(unlogged=unlogged)
+    elif fast_load and dfile.capabilities.get("fast_load"):
+        dfile.fast_load_data(unlogged=unlogged)
+    else:
+        if fast_load or replace_load:
+            logger.debug(f"{dfile.new_table_name}: the backend has no fast or replace load, using import_data")
+        dfile.import_data()
+    return time.perf_counter() - start
+
+
+def import_all(src_df_objs, workers, fast_load=False, unlogged=False, replace_load=False):
+    """
+    Imports every data file. Backends that declare the parallel_load capability are
+    loaded concurrently, the rest run one at a time. Logs the load time of each table.
+    """
+    parallel = [dfile for dfile in src_df_objs if dfile.capabilities.get("parallel_load")]
+    sequential = [dfile for dfile in src_df_objs if not dfile.capabilities.get("parallel_load")]
+    load = lambda dfile: (dfile.new_table_name, load_table(dfile, fast_load, unlogged, replace_load))
+
+    timings = []
+    if workers > 1 and len(parallel) > 1:
+        logger.debug(f"Importing {len(parallel)} tables using {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            timings.extend(pool.map(load, parallel))
+    else:
+        sequential = parallel + sequential
+
+    for dfile in sequential:
+        logger.debug(f"Importing src data into the pipeline db")
+        timings.append(load(dfile))
+
+    width = max([len(table) for table, _ in timings] + [5])
+    lines = [f"{'table':<{width}}  {'seconds':>9}"]
+    lines.extend(f"{table:<{width}}  {seconds:>9.2f}" for table, seconds in timings)
+    logger.info("Load times:\n" + "\n".join(lines))
+    return timings
+
+
+def reconcile_row_counts(src_df_objs, workers):
+    """
+    Compares the csv records of each data file with count(*) of its loaded table. Files are
+    counted in parallel processes, tables queried in parallel threads.
+    Returns [(table, file_rows, loaded_rows, matches)].
+    """
+    csv_files = [dfile.paths["src_data_dir"] / Path(f"{dfile.src_data_csv}") for dfile in src_df_objs]
+    workers = max(workers, 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as files, ThreadPoolExecutor(max_workers=workers) as tables:
+        file_counts = files.map(count_data_rows, csv_files)
+        table_counts = tables.map(lambda dfile: dfile.count_loaded_rows(), src_df_objs)
+        report = [
+            (dfile.new_table_name, file_rows, loaded_rows, file_rows == loaded_rows)
+            for dfile, file_rows, loaded_rows in zip(src_df_objs, file_counts, table_counts)
+        ]
+
+    width = max([len(table) for table, *_ in report] + [5])
+    lines = [f"{'table':<{width}}  {'file rows':>12}  {'loaded rows':>12}"]
+    for table, file_rows, loaded_rows, matches in report:
+        loaded = "?" if loaded_rows is None else loaded_rows
+        lines.append(f"{table:<{width}}  {file_rows:>12}  {loaded:>12}{'' if matches else '  MISMATCH'}")
+    logger.info("Row count reconciliation:\n" + "\n".join(lines))
+
+    mismatched = [table for table, *_, matches in report if not matches]
+    if mismatched:
+        logger.error(f"❌ Loaded row counts do not match the data files: {mismatched}")
+    return report
+
+
+def main(study_id, src_data_path, workers=1, sample_rows=0, skip_header_check=False, reconcile=True,
+         fast_load=False, unlogged=False, replace_load=False):
+    if fast_load and replace_load:
+        raise ValueError("Use either fast_load or replace_load, not both")
 
     # Set paths
     paths = get_paths(study_id, src_data_path)
@@ -52,15 +130,25 @@ def main(study_id, src_data_path):
     validate_study_config(study_config, paths["src_data_dir"])
     logger.debug("End validation of study config")
 
+    if not skip_header_check:
+        # Fail before any table is created or loaded.
+        reports = validate_data_file_headers(study_config, paths["src_data_dir"], sample_rows=sample_rows)
+        failed = [table_id for table_id, report in reports.items() if header_errors(report)]
+        if failed:
+            raise ValueError(f"Data file headers do not match their data dictionaries: {failed}")
+        logger.debug(f"Data file headers match their data dictionaries")
+
     for dd in src_dd_objs:
 
         logger.debug(f"Start pipeline db, src table creation")
         dd.generate_new_table()
 
-    for dfile in src_df_objs:
+    # One table at a time unless the caller asks for more.
+    workers = workers or 1
+    import_all(src_df_objs, workers, fast_load=fast_load, unlogged=unlogged, replace_load=replace_load)
 
-        logger.debug(f"Importing src data into the pipeline db")
-        dfile.import_data()
+    if reconcile:
+        reconcile_row_counts(src_df_objs, workers)
 
     logger.info(f"END SCRIPT")
 
@@ -82,6 +170,62 @@ if __name__ == "__main__":
         help="Path to the directory containing src data files. If not set, defaults to the {dbt project}/data path",
     )
 
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        default=1,
+        type=int,
+        help="Number of tables to import at once, for backends that support parallel loads. Defaults to 1, one table at a time.",
+    )
+
+    parser.add_argument(
+        "-n",
+        "--sample_rows",
+        required=False,
+        default=0,
+        type=int,
+        help="Rows after the header of each data file checked for the header's field count",
+    )
+
+    parser.add_argument(
+        "--skip_header_check",
+        required=False,
+        action="store_true",
+        help="Load without checking the data file headers against the data dictionaries",
+    )
+
+    parser.add_argument(
+        "--skip_reconcile",
+        required=False,
+        action="store_true",
+        help="Do not compare the loaded row counts with the data files after the import",
+    )
+
+    parser.add_argument(
+        "--fast_load",
+        required=False,
+        action="store_true",
+        help="Replace the src tables' rows with TRUNCATE and COPY FREEZE in one transaction, then ANALYZE. Postgres backends only.",
+    )
+
+    parser.add_argument(
+        "--unlogged",
+        required=False,
+        action="store_true",
+        help="With --fast_load or --replace_load, make the src tables UNLOGGED. Faster, but they are emptied after a database crash.",
+    )
+
+    parser.add_argument(
+        "--replace_load",
+        required=False,
+        action="store_true",
+        help="Load each src table into a shadow table, check its row count and swap it in with a rename. Readers keep the old rows until the swap. Postgres backends only.",
+    )
+
     args = parser.parse_args()
 
-    main(study_id=args.study_id, src_data_path=args.filepath)
+    main(study_id=args.study_id, src_data_path=args.filepath, workers=args.workers,
+         sample_rows=args.sample_rows, skip_header_check=args.skip_header_check,
+         reconcile=not args.skip_reconcile, fast_load=args.fast_load, unlogged=args.unlogged,
+         replace_load=args.replace_load)
@@ -1,52 +1,252 @@
 import csv
+import re
+from pathlib import Path
 from dbt_pipeline_utils import logger
 
+ENUMS_DIR = 'data/static/enumerations'
 
-def main(study_id):
-    # Initialize a dictionary to store case statements grouped by target field
-    case_statements = {}
-    csv_file_path = f'data/static/enumerations/{study_id}_enums.csv' 
+SEED_HEADER = ["src_table", "src_field", "tgt_field", "src_value", "tgt_value"]
+
+# Macros used by the lookup mode. The seed is filtered on constants, so each join is a hash
+# join on src_value instead of a linear scan through CASE branches.
+LOOKUP_MACROS = """{% macro enum_lookup_join(seed, src_table, src_field, tgt_field, alias) -%}
+left join {{ ref(seed) }} as {{ alias }}
+    on {{ alias }}.src_table = '{{ src_table }}'
+    and {{ alias }}.src_field = '{{ src_field }}'
+    and {{ alias }}.tgt_field = '{{ tgt_field }}'
+    and {{ alias }}.src_value = {{ src_table }}.{{ src_field }}::text
+{%- endmacro %}
+
+{#- The seed stores tgt_value as text, it is cast back to the target's type. Source fields are
+    tried in the order given, the first one with a match wins. -#}
+{% macro enum_lookup_value(aliases, tgt_field, default='null', type='text') -%}
+case
+{%- for alias in aliases %}
+    when {{ alias }}.src_value is not null then {{ alias }}.tgt_value::{{ type }}
+{%- endfor %}
+    else ({{ default }})::{{ type }}
+end as "{{ tgt_field }}"
+{%- endmacro %}
+"""
 
-    # Open and read the CSV file
+NUMBER = re.compile(r"^[+-]?\d+(\.\d*)?$")
+
+
+def read_enums(csv_file_path):
+    """Streams the in use rows of an enumerations csv."""
     with open(csv_file_path, 'r') as csvfile:
         reader = csv.DictReader(csvfile)
-        
+
         for row in reader:
             # Skip rows not in use
             if row['in_use'] != 'T':
                 continue
-            
-            # Extract relevant data from the row
-            src_table = row['src_table']
-            src_field = row['src_field']
-            expected_src_value = row['expected_src_value']
-            equivalent_model_value = row['equivalent_model_value']
-            tgt_field = row['tgt_field']
-            
-            # Initialize the case statement for a target field if not already done
-            if tgt_field not in case_statements:
-                case_statements[tgt_field] = []
-            
-            # Add `WHEN` clauses to the case statement
-            if expected_src_value and expected_src_value != 'else':
-                case_statements[tgt_field].append(
-                    f"    when  {src_table}.{src_field} = {expected_src_value}")
-                case_statements[tgt_field].append(
-                        f"      then {equivalent_model_value}")
-            elif expected_src_value == 'else':
-                # Handle the ELSE clause for `else`
-                case_statements[tgt_field].append(
-                    f"    else {equivalent_model_value}"
-                )
-    
+            yield row
+
+
+def sql_literal_value(literal):
+    """The value of a SQL literal as written in the enumerations csv: 'Male' -> Male, null -> None."""
+    literal = literal.strip()
+    if literal.lower() == 'null':
+        return None
+    if len(literal) >= 2 and literal[0] == literal[-1] == "'":
+        return literal[1:-1].replace("''", "'")
+    return literal
+
+
+def literal_type(literal):
+    """
+    The SQL type of a plain literal: 'Male' -> text, 2 -> integer, 1.5 -> numeric,
+    true -> boolean, null -> None. Raises ValueError for anything else, e.g. an expression.
+    """
+    literal = literal.strip()
+    if literal.lower() == 'null':
+        return None
+    if len(literal) >= 2 and literal[0] == literal[-1] == "'" and "'" not in literal[1:-1].replace("''", ""):
+        return 'text'
+    if NUMBER.match(literal):
+        return 'numeric' if '.' in literal else 'integer'
+    if literal.lower() in ('true', 'false'):
+        return 'boolean'
+    raise ValueError(f"Not a plain SQL literal: {literal}")
+
+
+def target_type(rows):
+    """
+    The type of a target field's values, or None when a source or target value is not a plain
+    literal, or the target values have different types. integer and numeric combine to numeric.
+    Source values are matched as text, their types don't need to agree.
+    """
+    types = set()
+    try:
+        for row in rows:
+            if row['expected_src_value'] != 'else':
+                literal_type(row['expected_src_value'])
+            types.add(literal_type(row['equivalent_model_value']))
+    except ValueError:
+        return None
+
+    types.discard(None)
+    if types == {'integer', 'numeric'}:
+        return 'numeric'
+    if len(types) > 1:
+        return None
+    return types.pop() if types else 'text'
+
+
+def case_statements_sql(csv_file_path):
+    return case_statements_from_rows(read_enums(csv_file_path))
+
+
+def case_statements_from_rows(rows):
+    # Initialize a dictionary to store case statements grouped by target field
+    case_statements = {}
+
+    for row in rows:
+        # Extract relevant data from the row
+        src_table = row['src_table']
+        src_field = row['src_field']
+        expected_src_value = row['expected_src_value']
+        equivalent_model_value = row['equivalent_model_value']
+        tgt_field = row['tgt_field']
+
+        # Initialize the case statement for a target field if not already done
+        if tgt_field not in case_statements:
+            case_statements[tgt_field] = []
+
+        # Add `WHEN` clauses to the case statement
+        if expected_src_value and expected_src_value != 'else':
+            case_statements[tgt_field].append(
+                f"    when  {src_table}.{src_field} = {expected_src_value}")
+            case_statements[tgt_field].append(
+                    f"      then {equivalent_model_value}")
+        elif expected_src_value == 'else':
+            # Handle the ELSE clause for `else`
+            case_statements[tgt_field].append(
+                f"    else {equivalent_model_value}"
+            )
+
     # Generate the final SQL case statements
     sql_statements = []
     for tgt_field, conditions in case_statements.items():
         # Combine all `WHEN` clauses and the `ELSE` clause into a single case statement
         case_statement = f"    case\n" + "\n".join(conditions) + f"\nend as \"{tgt_field}\","
         sql_statements.append(case_statement)
-    
-    r =  "\n\n".join(sql_statements)
 
-    logger.info(f"Generated using the csv located at {csv_file_path}\n \n {r}")
+    return "\n\n".join(sql_statements)
 
+
+def lookup_sql(study_id, csv_file_path, output_dir):
+    """
+    Writes the mappings to a dbt seed and the join macros to macros/enum_lookup.sql.
+    Returns the joins and select expressions to paste into the model. Each target field
+    gets one join per source field it maps from, and `else` rows become the default.
+
+    Priority: source fields are tried in the order they first appear in the csv, and within
+    one source field the first row for a value wins. Unlike CASE mode, rows of different
+    source fields that are interleaved in the csv don't keep their row order.
+
+    Target fields with a value that is not a plain literal (an expression), or with values
+    of different types, keep a CASE expression.
+    """
+    seed = f"{study_id}_enum_map"
+    seeds_dir = Path(output_dir) / "seeds"
+    macros_dir = Path(output_dir) / "macros"
+    seeds_dir.mkdir(parents=True, exist_ok=True)
+    macros_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = {}  # tgt_field -> rows, in csv order
+    for row in read_enums(csv_file_path):
+        rows.setdefault(row['tgt_field'], []).append(row)
+    types = {tgt_field: target_type(tgt_rows) for tgt_field, tgt_rows in rows.items()}
+    case_fields = [tgt_field for tgt_field, sql_type in types.items() if sql_type is None]
+    for tgt_field in case_fields:
+        logger.warning(f"{tgt_field} has values that are not plain literals of one type, keeping its CASE expression")
+
+    sources = {}  # tgt_field -> [(src_table, src_field)], in csv order
+    defaults = {}  # tgt_field -> else literal
+    seen = set()
+
+    with open(seeds_dir / f"{seed}.csv", 'w', newline='') as seedfile:
+        writer = csv.writer(seedfile)
+        writer.writerow(SEED_HEADER)
+
+        for row in (row for tgt_field, tgt_rows in rows.items() if types[tgt_field] for row in tgt_rows):
+            src_table = row['src_table']
+            src_field = row['src_field']
+            expected_src_value = row['expected_src_value']
+            tgt_field = row['tgt_field']
+
+            if expected_src_value == 'else':
+                defaults[tgt_field] = row['equivalent_model_value']
+                continue
+            if not expected_src_value:
+                continue
+
+            source = (src_table, src_field)
+            if source not in sources.setdefault(tgt_field, []):
+                sources[tgt_field].append(source)
+
+            src_value = sql_literal_value(expected_src_value)
+            # CASE keeps the first matching branch, so does the join.
+            key = (src_table, src_field, tgt_field, src_value)
+            if key in seen:
+                continue
+            seen.add(key)
+            writer.writerow([src_table, src_field, tgt_field, src_value,
+                             sql_literal_value(row['equivalent_model_value'])])
+
+    # Seed values are compared as text, don't let dbt infer numeric or boolean columns.
+    column_types = "".join(f"        {col}: text\n" for col in SEED_HEADER)
+    seed_config = f"""version: 2
+
+seeds:
+  - name: {seed}
+    config:
+      column_types:
+{column_types}"""
+    (seeds_dir / f"{seed}.yml").write_text(seed_config)
+    (macros_dir / "enum_lookup.sql").write_text(LOOKUP_MACROS)
+
+    joins = []
+    selects = []
+    for i, tgt_field in enumerate(sources):
+        aliases = []
+        for j, (src_table, src_field) in enumerate(sources[tgt_field]):
+            alias = f"enum_{i}_{j}"
+            aliases.append(alias)
+            joins.append(
+                f"{{{{ enum_lookup_join('{seed}', '{src_table}', '{src_field}', '{tgt_field}', '{alias}') }}}}")
+        default = defaults.get(tgt_field, 'null').replace('"', '\\"')
+        selects.append(
+            f"    {{{{ enum_lookup_value({aliases}, '{tgt_field}', \"{default}\", '{types[tgt_field]}') }}}},")
+
+    # Target fields with only an else row map every value to the default.
+    for tgt_field in defaults.keys() - sources.keys():
+        selects.append(f"    {defaults[tgt_field]} as \"{tgt_field}\",")
+
+    if case_fields:
+        selects.append(case_statements_from_rows(row for tgt_field in case_fields for row in rows[tgt_field]))
+
+    return "\n".join(selects) + "\n\n" + "\n".join(joins)
+
+
+def main(study_id, mode="case", output_dir=ENUMS_DIR):
+    """
+    mode:
+     - case: one CASE expression per target field.
+     - lookup: a seed table of the mappings, joined on (src_table, src_field, src_value).
+       Keeps the SQL small for studies with thousands of enumeration rows. Run dbt seed
+       after copying output_dir/seeds and output_dir/macros into the dbt project.
+    """
+    csv_file_path = f'{ENUMS_DIR}/{study_id}_enums.csv'
+
+    if mode == "case":
+        r = case_statements_sql(csv_file_path)
+    elif mode == "lookup":
+        r = lookup_sql(study_id, csv_file_path, output_dir)
+    else:
+        logger.error(f"generate_case_statements does not recognize mode {mode}. Choices ['case','lookup']")
+        return
+
+    logger.info(f"Generated using the csv located at {csv_file_path}\n \n {r}")